@@ -5,9 +5,29 @@ from django.utils.html import format_html, urlencode
 from import_export.admin import ImportExportModelAdmin
 
 from . import models
+from .exports import EXPORTS, export_response
+from .ledger import adjust_balance
 from .resources import ProductResource
 
 
+class StreamingExportMixin:
+    """Admin actions exporting the selected rows through the streaming exporter, see src/auction/exports.py."""
+
+    export_name = None
+    actions = ['export_csv', 'export_json']
+
+    def stream_export(self, queryset, file_format):
+        return export_response(queryset, EXPORTS[self.export_name][1], file_format, self.export_name)
+
+    @admin.action(description='Export selected as CSV')
+    def export_csv(self, request, queryset):
+        return self.stream_export(queryset, 'csv')
+
+    @admin.action(description='Export selected as JSON')
+    def export_json(self, request, queryset):
+        return self.stream_export(queryset, 'json')
+
+
 @admin.register(models.Collection)
 class CollectionAdmin(admin.ModelAdmin):
     list_display = ['title', 'slug', 'products_count']
@@ -39,7 +59,8 @@ class ProductImageInline(admin.TabularInline):
 
 
 @admin.register(models.Product)
-class ProductAdmin(ImportExportModelAdmin, admin.ModelAdmin):
+class ProductAdmin(StreamingExportMixin, ImportExportModelAdmin, admin.ModelAdmin):
+    export_name = 'products'
     list_display = ['title', 'price', 'collection_title', 'in_auction']
     list_select_related = ['collection']  # For optimization of query
     list_editable = ['price']
@@ -80,7 +101,8 @@ class CustomerAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(StreamingExportMixin, admin.ModelAdmin):
+    export_name = 'transactions'
     list_per_page = 10
     list_display = [
         'reference_id',
@@ -95,10 +117,10 @@ class TransactionAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.Auction)
-class AuctionAdmin(admin.ModelAdmin):
-    # TODO: Queryset Optimization
-
+class AuctionAdmin(StreamingExportMixin, admin.ModelAdmin):
+    export_name = 'auctions'
     list_per_page = 10
+    list_select_related = ['product']
     list_display = [
         'product',
         'starting_price',
@@ -119,14 +141,14 @@ class AuctionAdmin(admin.ModelAdmin):
     list_filter = ['auction_status']
     autocomplete_fields = ['product']
 
+    @admin.display(description='Bids', ordering='bids_count')
     def total_bids(self, auction):
-        return auction.bids.count()
-
-    total_bids.short_description = 'Bids'
+        return auction.bids_count
 
 
 @admin.register(models.Bid)
-class BidAdmin(admin.ModelAdmin):
+class BidAdmin(StreamingExportMixin, admin.ModelAdmin):
+    export_name = 'bids'
     list_display = ['bidder', 'auction', 'amount', 'status']
     list_editable = ['status', 'amount']
     search_fields = [
@@ -138,6 +160,22 @@ class BidAdmin(admin.ModelAdmin):
     autocomplete_fields = ['bidder', 'auction']
 
 
+@admin.register(models.CoinHold)
+class CoinHoldAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'auction', 'amount', 'status']
+    list_filter = ['status']
+    list_select_related = ['customer__user', 'auction__product']
+    autocomplete_fields = ['customer', 'auction']
+
+
+@admin.register(models.ProxyBid)
+class ProxyBidAdmin(admin.ModelAdmin):
+    list_display = ['bidder', 'auction', 'max_amount', 'active']
+    list_filter = ['active']
+    search_fields = ['bidder__user__first_name', 'bidder__user__last_name', 'auction__product__title']
+    autocomplete_fields = ['bidder', 'auction']
+
+
 @admin.register(models.Address)
 class AddressAdmin(admin.ModelAdmin):
     list_display = [
@@ -212,6 +250,30 @@ class WishlistItemAdmin(admin.ModelAdmin):
 class UserCoinAdmin(admin.ModelAdmin):
     list_display = ['customer', 'balance']
 
+    def save_model(self, request, obj, form, change):
+        if not change or 'balance' not in form.changed_data:
+            return super().save_model(request, obj, form, change)
+        # Balance edits go through the ledger as an adjustment instead of overwriting the snapshot
+        adjust_balance(obj.customer_id, obj.balance - form.initial['balance'])
+
+
+@admin.register(models.LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'customer', 'entry_type', 'available', 'held', 'auction', 'created_at']
+    list_filter = ['entry_type']
+    list_select_related = ['customer__user', 'auction__product']
+    autocomplete_fields = ['customer', 'auction']
+    readonly_fields = ['customer', 'entry_type', 'available', 'held', 'auction', 'bid', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(models.Question)
 class AuctionQuestionAdmin(admin.ModelAdmin):
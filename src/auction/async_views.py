@@ -0,0 +1,135 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from src.core.authentication import StatelessJWTAuthentication
+
+from .bidding import BidRejected, place_bid
+from .ingestion import deferred_ingestion_enabled, submit_bid
+from .models import Auction, Bid, Customer
+from .proxy import resolve_proxies
+from .queryplan import apply_query_plan
+from .serializers import AuctionSerializer, BidsSerializer
+from .throttles import check_bid_throttles
+from .views import AuctionViewSet, BidsViewSet
+
+# ASGI-native versions of the hottest read endpoints and of bid placement. They await the ORM
+# instead of pinning a worker thread, so one ASGI process can hold many concurrent connections.
+# Work that only exists as sync code (AuctionViewSet's filtering, the bid ingestion modes) runs
+# through sync_to_async, which is how the async ORM runs its queries too.
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status_code)
+
+
+def auction_queryset():
+    return apply_query_plan(Auction.objects.all(), AuctionSerializer)
+
+
+def error_response(exception):
+    detail = exception.detail if isinstance(exception.detail, (list, dict)) else {'detail': exception.detail}
+    return render(detail, exception.status_code)
+
+
+def auction_page(request):
+    """
+    The page /api/auctions/ serves for the same query string, without its listing cache.
+
+    AuctionViewSet's filter backends apply ``?search=``, ``?ordering=`` and the AuctionFilter
+    fields, and its cursor paginator pages the result, so both lists accept the same parameters
+    and return the same links.
+    """
+    view = AuctionViewSet(request=Request(request), args=(), kwargs={}, format_kwarg=None, action='list')
+    page = view.paginate_queryset(view.filter_queryset(auction_queryset()))
+    return view.get_paginated_response(AuctionSerializer(page, many=True).data).data
+
+
+def bid_page(request, auction_id):
+    """
+    The page /api/auctions/<id>/bids/ serves for the same query string.
+
+    BidsViewSet's search and its cursor paginator, ordered by ``-updated_at``, page the bids, so
+    both lists accept the same parameters and return the same next and previous cursors.
+    """
+    view = BidsViewSet(request=Request(request), args=(), kwargs={'auction_pk': auction_id}, format_kwarg=None, action='list')
+    page = view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+    return view.get_paginated_response(BidsSerializer(page, many=True).data).data
+
+
+@require_GET
+async def auction_list(request):
+    try:
+        return render(await sync_to_async(auction_page)(request))
+    except APIException as e:
+        return error_response(e)
+
+
+@require_GET
+async def auction_detail(request, auction_id):
+    try:
+        auction = await auction_queryset().aget(pk=auction_id)
+    except Auction.DoesNotExist:
+        return render({'detail': 'Auction not found.'}, status.HTTP_404_NOT_FOUND)
+    return render(AuctionSerializer(auction).data)
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def auction_bids(request, auction_id):
+    if request.method == 'GET':
+        return render(await sync_to_async(bid_page)(request, auction_id))
+
+    try:
+        authenticated = await sync_to_async(StatelessJWTAuthentication().authenticate)(request)
+    except (AuthenticationFailed, InvalidToken) as e:
+        return render({'detail': str(e)}, status.HTTP_401_UNAUTHORIZED)
+    if authenticated is None:
+        return render({'detail': 'Authentication credentials were not provided.'}, status.HTTP_401_UNAUTHORIZED)
+    user, token = authenticated
+    request.user = user
+
+    throttle = await sync_to_async(check_bid_throttles)(request, auction_id)
+    if throttle is not None:
+        throttled = Throttled(throttle.wait())
+        response = render({'detail': throttled.detail}, status.HTTP_429_TOO_MANY_REQUESTS)
+        if throttled.wait is not None:
+            response['Retry-After'] = '%d' % throttled.wait
+        return response
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return render({'detail': 'JSON parse error.'}, status.HTTP_400_BAD_REQUEST)
+    serializer = BidsSerializer(data=data)
+    if not serializer.is_valid():
+        return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    bidder_id = token.get('customer_id')
+    if bidder_id is None:
+        bidder_id = await Customer.objects.filter(user_id=user.id).values_list('id', flat=True).afirst()
+    amount = serializer.validated_data['amount']
+    if deferred_ingestion_enabled():
+        data, status_code, headers = await sync_to_async(submit_bid)(request, auction_id, bidder_id, amount)
+        response = render(data, status_code)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    title = await Auction.objects.filter(pk=auction_id).values_list('product__title', flat=True).afirst()
+    try:
+        bid = await sync_to_async(place_bid)(auction_id, bidder_id, amount, invoice=f'Bids on {title}')
+    except BidRejected as e:
+        return render({'amount': [str(e)]}, status.HTTP_400_BAD_REQUEST)
+    await sync_to_async(resolve_proxies)(auction_id, invoice=f'Proxy bid on {title}')
+
+    bid = await apply_query_plan(Bid.objects.all(), BidsSerializer).aget(pk=bid.id)
+    return render(BidsSerializer(bid).data, status.HTTP_201_CREATED)
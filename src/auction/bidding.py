@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DateTimeField, ExpressionWrapper, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_auctions
+from .events import EVENT_BID, EVENT_EXTENDED, publish_auction_event
+from .ledger import hold
+from .models import Auction, Bid, CoinHold, Transaction, UserCoin
+
+
+class BidRejected(Exception):
+    pass
+
+
+class InsufficientBalance(BidRejected):
+    pass
+
+
+def auction_window_key(auction_id):
+    return f'auction:{auction_id}:window'
+
+
+def get_auction_window(auction_id):
+    """Status, time window and soft-close settings of an auction, served from the cache on the bid path."""
+    key = auction_window_key(auction_id)
+    window = cache.get(key)
+    if window is None:
+        window = (
+            Auction.objects.filter(pk=auction_id)
+            .values_list('auction_status', 'starting_time', 'ending_time', 'soft_close_window', 'soft_close_extension')
+            .first()
+        )
+        cache.set(key, window, settings.AUCTION_WINDOW_CACHE_TIMEOUT)
+    return window
+
+
+def forget_auction_windows(auction_ids):
+    cache.delete_many([auction_window_key(auction_id) for auction_id in auction_ids])
+
+
+def check_auction_window(auction_id, now):
+    """Reject a bid on an auction that is not accepting bids at ``now``, from its cached window; returns the window."""
+    window = get_auction_window(auction_id)
+    if window is None:
+        raise BidRejected('No Auction with this ID was found.')
+    auction_status, starting_time, ending_time, soft_close_window, soft_close_extension = window
+    soft_close_enabled = bool(soft_close_window and soft_close_extension)
+    if auction_status != Auction.AUCTION_ACTIVE or now < starting_time or (now >= ending_time and not soft_close_enabled):
+        raise BidRejected('This auction is not accepting bids.')
+    return window
+
+
+def place_bid(auction_id, bidder_id, amount, invoice=''):
+    """
+    Validate and commit a bid with conditional updates instead of read-then-write.
+
+    The auction row is only touched by ``UPDATE ... WHERE current_price < amount``, so concurrent
+    bidders queue on the row lock and Postgres re-checks the condition once the lock is released:
+    lower bids are rejected instead of overwriting a higher price. The bid amount is held in the
+    bidder's CoinHold for the auction, and only the raise over what that hold already locks is
+    charged to their balance. Returns the bid, whose amount is the new current price.
+
+    Soft-close auctions are extended in the same UPDATE when the bid lands in their closing window.
+    Extensions only move the ending time forward, so a cached ending time is never later than the
+    real one: whenever the real window is hit, the cached one is too and the cache is dropped. It
+    can be earlier though (another process extended the auction and its cache was not dropped yet),
+    so the cached ending time never rejects a bid on a soft-close auction: ``ending_time__gt`` in
+    the UPDATE does, against the real row.
+    """
+    now = timezone.now()
+    _, _, ending_time, soft_close_window, soft_close_extension = check_auction_window(auction_id, now)
+
+    extend = {}
+    soft_close = bool(soft_close_window and soft_close_extension) and now >= ending_time - soft_close_window
+    if soft_close:
+        extend['ending_time'] = Case(
+            When(
+                ending_time__lte=ExpressionWrapper(Value(now) + F('soft_close_window'), output_field=DateTimeField()),
+                then=F('ending_time') + F('soft_close_extension'),
+            ),
+            default=F('ending_time'),
+        )
+
+    with transaction.atomic():
+        bid = Bid.objects.select_for_update().filter(auction_id=auction_id, bidder_id=bidder_id).first()
+        is_new = bid is None
+        if is_new:
+            try:
+                with transaction.atomic():
+                    bid = Bid.objects.create(auction_id=auction_id, bidder_id=bidder_id, amount=amount)
+            except IntegrityError:
+                # A concurrent first bid of the same bidder got in after the lookup: raise that one instead
+                is_new = False
+                bid = Bid.objects.select_for_update().get(auction_id=auction_id, bidder_id=bidder_id)
+
+        if not is_new:
+            bid.amount = amount
+            bid.status = True
+            bid.save(update_fields=['amount', 'status', 'updated_at'])
+
+        # The locked bid row serializes the bids of this bidder here, so the hold can be read as is
+        held = (
+            CoinHold.objects.filter(auction_id=auction_id, customer_id=bidder_id, status=CoinHold.HOLD_STATUS_HELD)
+            .values_list('amount', flat=True)
+            .first()
+        )
+        charge = amount - (held or 0)
+
+        # The bid row is written first so the auction's denormalized stats can point at it.
+        updated = Auction.objects.filter(
+            pk=auction_id,
+            auction_status=Auction.AUCTION_ACTIVE,
+            ending_time__gt=now,
+            current_price__lt=amount,
+        ).update(
+            current_price=amount,
+            bids_count=F('bids_count') + int(is_new),
+            highest_bid_id=bid.id,
+            last_bid_at=now,
+            updated_at=now,
+            **extend,
+        )
+        if not updated:
+            if soft_close and not Auction.objects.filter(pk=auction_id, ending_time__gt=now).exists():
+                raise BidRejected('This auction is not accepting bids.')
+            raise BidRejected('Bid Amount Must be grater than the current bid amount')
+
+        CoinHold.objects.bulk_create(
+            [CoinHold(auction_id=auction_id, customer_id=bidder_id, amount=amount)],
+            update_conflicts=True,
+            unique_fields=['auction', 'customer'],
+            update_fields=['amount', 'status', 'updated_at'],
+        )
+        hold(bidder_id, charge, auction_id, bid.id).save()
+        Transaction.objects.create(
+            invoice=invoice,
+            user_id=bidder_id,
+            transaction_type=Transaction.TRANSACTION_TYPE_BID,
+            transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
+            amount=charge,
+        )
+        transaction.on_commit(lambda: invalidate_auctions([auction_id], listing=False))
+        publish_auction_event(auction_id, EVENT_BID, bid_id=bid.id, bidder_id=bidder_id, current_price=str(amount))
+
+        if soft_close:
+            # Only bids in the closing window pay for reading the (locked) row back
+            new_ending_time = Auction.objects.filter(pk=auction_id).values_list('ending_time', flat=True).get()
+            transaction.on_commit(lambda: forget_auction_windows([auction_id]))
+            if new_ending_time != ending_time:
+                publish_auction_event(auction_id, EVENT_EXTENDED, ending_time=new_ending_time.isoformat())
+
+        # Last statement on purpose: the bidder's balance row is shared by all their auctions, so
+        # it is only locked for the commit itself and concurrent bids of one customer barely queue.
+        charged = UserCoin.objects.filter(customer_id=bidder_id, balance__gte=charge).update(
+            balance=F('balance') - charge, updated_at=now
+        )
+        if not charged:
+            raise InsufficientBalance("You don't have enough balance to bid")
+
+    return bid
+
+
+def refresh_auction_stats(queryset):
+    """Recompute the denormalized bid stats of the given auctions from the Bid table."""
+    bids = Bid.objects.filter(auction_id=OuterRef('pk'))
+    return queryset.update(
+        bids_count=Coalesce(Subquery(bids.values('auction_id').annotate(count=Count('id')).values('count')), 0),
+        highest_bid_id=Subquery(bids.order_by('-amount', 'created_at').values('id')[:1]),
+        last_bid_at=Subquery(bids.order_by('-updated_at').values('updated_at')[:1]),
+    )
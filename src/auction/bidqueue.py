@@ -0,0 +1,251 @@
+import threading
+import uuid
+from collections import defaultdict, deque
+from decimal import Decimal
+from functools import lru_cache
+from itertools import count
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .bidding import BidRejected, place_bid
+from .events import EVENT_TICKET, publish_auction_event
+from .models import Auction, Bid
+from .proxy import resolve_proxies
+
+# Queued bid ingestion: instead of writing a bid in the request, BidsViewSet enqueues it on the
+# partition of its auction and answers 202 with a ticket. Each partition is drained by a single
+# consumer (the drain_bid_partition task on Celery queue bids-<partition>, served by one worker
+# process), which applies the bids of an auction in arrival order and commits them in batches, so
+# a hot auction no longer has every request queueing on its row lock. Outcomes are kept under the
+# ticket for the status endpoint and published on the live stream of the auction.
+
+TICKET_QUEUED = 'queued'
+TICKET_ACCEPTED = 'accepted'
+TICKET_REJECTED = 'rejected'
+
+
+class RedisBidQueue:
+    """
+    One Redis stream per partition, read in push order through a consumer group.
+
+    A partition has a single consumer, so entries it claimed but never acknowledged (its batch
+    failed or the worker died before the acknowledgement) are its own pending entries, and they
+    are delivered again, marked as replayed, before any new entry.
+    """
+
+    group = 'appliers'
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+        self.groups = set()
+
+    def queue_key(self, partition):
+        return f'bidqueue:{partition}'
+
+    def consumer(self, partition):
+        return f'partition-{partition}'
+
+    def push(self, partition, entry):
+        self.client.xadd(self.queue_key(partition), entry)
+
+    def claim(self, partition, limit):
+        key = self.queue_key(partition)
+        if partition not in self.groups:
+            try:
+                self.client.xgroup_create(key, self.group, id='0', mkstream=True)
+            except redis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+            self.groups.add(partition)
+
+        entries = []
+        for start in ('0', '>'):
+            response = self.client.xreadgroup(self.group, self.consumer(partition), {key: start}, count=limit - len(entries))
+            for _, messages in response:
+                entries += [
+                    {**self.decode(message_id, fields), 'replayed': start == '0'} for message_id, fields in messages if fields
+                ]
+            if len(entries) >= limit:
+                break
+        return entries
+
+    def decode(self, message_id, fields):
+        entry = {key.decode(): value.decode() for key, value in fields.items()}
+        return {**entry, 'id': message_id.decode(), 'auction_id': int(entry['auction_id']), 'bidder_id': int(entry['bidder_id'])}
+
+    def ack(self, partition, entries):
+        ids = [entry['id'] for entry in entries]
+        if ids:
+            pipe = self.client.pipeline()
+            pipe.xack(self.queue_key(partition), self.group, *ids)
+            pipe.xdel(self.queue_key(partition), *ids)
+            pipe.execute()
+
+    def depth(self, partition):
+        return self.client.xlen(self.queue_key(partition))
+
+
+class InMemoryBidQueue:
+    """Process-local stand-in for RedisBidQueue, used for tests and local development."""
+
+    def __init__(self, url=None):
+        self.lock = threading.Lock()
+        self.ids = count(1)
+        self.queues = defaultdict(deque)
+        self.claimed = defaultdict(dict)  # entry id -> entry, until acknowledged
+
+    def push(self, partition, entry):
+        with self.lock:
+            self.queues[partition].append({**entry, 'id': next(self.ids)})
+
+    def claim(self, partition, limit):
+        with self.lock:
+            entries = [{**entry, 'replayed': True} for entry in list(self.claimed[partition].values())[:limit]]
+            queue = self.queues[partition]
+            while len(entries) < limit and queue:
+                entry = queue.popleft()
+                self.claimed[partition][entry['id']] = entry
+                entries.append({**entry, 'replayed': False})
+            return entries
+
+    def ack(self, partition, entries):
+        with self.lock:
+            for entry in entries:
+                self.claimed[partition].pop(entry['id'], None)
+
+    def depth(self, partition):
+        return len(self.queues[partition]) + len(self.claimed[partition])
+
+
+@lru_cache(maxsize=None)
+def get_bid_queue():
+    backend = import_string(settings.AUCTION_BID_QUEUE_BACKEND)
+    return backend(settings.AUCTION_REDIS_URL)
+
+
+def get_partition(auction_id):
+    return int(auction_id) % settings.AUCTION_BID_QUEUE_PARTITIONS
+
+
+def partition_queue(partition):
+    return f'bids-{partition}'
+
+
+def scheduled_key(partition):
+    return f'bidqueue:{partition}:scheduled'
+
+
+def ticket_key(ticket):
+    return f'bid-ticket:{ticket}'
+
+
+def get_ticket(ticket):
+    return cache.get(ticket_key(ticket))
+
+
+def set_ticket(ticket, state):
+    cache.set(ticket_key(ticket), state, settings.AUCTION_BID_TICKET_TIMEOUT)
+
+
+def schedule_drain(partition):
+    # One pending drain per partition is enough: the drain clears the flag before it starts
+    # claiming, so entries pushed after that schedule the next one
+    if cache.add(scheduled_key(partition), True, settings.AUCTION_BID_QUEUE_SCHEDULE_TIMEOUT):
+        from .tasks import drain_bid_partition
+
+        transaction.on_commit(lambda: drain_bid_partition.apply_async(args=[partition], queue=partition_queue(partition)))
+
+
+def enqueue_bid(auction_id, bidder_id, amount):
+    """Queue a bid for its partition's consumer and return the ticket its outcome is kept under."""
+    ticket = uuid.uuid4().hex
+    partition = get_partition(auction_id)
+    entry = {'auction_id': int(auction_id), 'bidder_id': bidder_id, 'amount': str(amount)}
+    set_ticket(ticket, {'status': TICKET_QUEUED, **entry})
+    get_bid_queue().push(partition, {'ticket': ticket, **entry})
+    schedule_drain(partition)
+    return ticket
+
+
+def apply_queued_bids(partition, limit):
+    """
+    Apply up to ``limit`` queued bids of a partition in one transaction, in arrival order.
+
+    Each bid runs in its own savepoint, so a rejected bid only rolls back itself. Once the batch
+    is committed, the tickets are updated, then the entries acknowledged and the live stream
+    updated. A batch that fails is delivered again by the next drain.
+
+    A worker can also die after the commit but before the acknowledgement. The replayed entries
+    then keep the outcome they already had instead of being placed again, which would reject
+    them as not higher than themselves. That outcome is the stored ticket, or, if the tickets
+    were not updated either, the committed bid of the bidder at that amount.
+    """
+    queue = get_bid_queue()
+    entries = queue.claim(partition, limit)
+    if not entries:
+        return 0
+
+    auction_ids = {entry['auction_id'] for entry in entries}
+    titles = dict(Auction.objects.filter(pk__in=auction_ids).values_list('id', 'product__title'))
+    outcomes = []
+    with transaction.atomic():
+        for entry in entries:
+            state = {'auction_id': entry['auction_id'], 'bidder_id': entry['bidder_id'], 'amount': entry['amount']}
+            outcome = entry['replayed'] and replayed_outcome(entry)
+            if outcome:
+                outcomes.append((entry['ticket'], {**state, **outcome}))
+                continue
+            try:
+                bid = place_bid(
+                    entry['auction_id'],
+                    entry['bidder_id'],
+                    Decimal(entry['amount']),
+                    invoice=f"Bids on {titles.get(entry['auction_id'])}",
+                )
+            except BidRejected as e:
+                state.update(status=TICKET_REJECTED, detail=str(e))
+            else:
+                state.update(status=TICKET_ACCEPTED, bid_id=bid.id)
+            outcomes.append((entry['ticket'], state))
+
+        for auction_id in auction_ids:
+            resolve_proxies(auction_id, invoice=f'Proxy bid on {titles.get(auction_id)}')
+
+        for ticket, state in outcomes:
+            publish_auction_event(state['auction_id'], EVENT_TICKET, ticket=ticket, status=state['status'])
+        transaction.on_commit(lambda: store_outcomes(outcomes))
+        transaction.on_commit(lambda: queue.ack(partition, entries))
+    return len(entries)
+
+
+def replayed_outcome(entry):
+    """Outcome of a replayed entry whose batch was committed already, or None if it was not."""
+    ticket = get_ticket(entry['ticket'])
+    if ticket and ticket['status'] != TICKET_QUEUED:
+        return {key: value for key, value in ticket.items() if key in ('status', 'detail', 'bid_id')}
+
+    bid_id = (
+        Bid.objects.filter(
+            auction_id=entry['auction_id'], bidder_id=entry['bidder_id'], amount=Decimal(entry['amount']), status=True
+        )
+        .values_list('id', flat=True)
+        .first()
+    )
+    return {'status': TICKET_ACCEPTED, 'bid_id': bid_id} if bid_id else None
+
+
+def store_outcomes(outcomes):
+    for ticket, state in outcomes:
+        set_ticket(ticket, state)
+
+
+def drain_partition(partition):
+    cache.delete(scheduled_key(partition))
+    applied = 0
+    while count := apply_queued_bids(partition, settings.AUCTION_BID_QUEUE_BATCH_SIZE):
+        applied += count
+    return applied
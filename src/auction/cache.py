@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+LISTING_VERSION_KEY = 'auction-cache:listing:version'
+HITS_KEY = 'auction-cache:hits'
+MISSES_KEY = 'auction-cache:misses'
+
+
+def auction_version_key(auction_id):
+    return f'auction-cache:{auction_id}:version'
+
+
+def auction_slug_key(slug):
+    return f'auction-cache:slug:{slug}'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def invalidate_auctions(auction_ids, listing=True):
+    """
+    Make every cached payload of these auctions stale by bumping their version keys.
+
+    A bid only changes its own auction, so the bid path skips the listing version: listings
+    catch up with new prices within AUCTION_LISTING_CACHE_TIMEOUT seconds.
+    """
+    keys = [auction_version_key(auction_id) for auction_id in auction_ids]
+    if listing:
+        keys.append(LISTING_VERSION_KEY)
+    for key in keys:
+        increment(key)
+
+
+def get_stats():
+    return {'hits': cache.get(HITS_KEY, 0), 'misses': cache.get(MISSES_KEY, 0)}
+
+
+def get_or_build(key, build, timeout):
+    """
+    Read-through cache with stampede protection.
+
+    Entries are kept for ``timeout`` plus a grace period. Once an entry expires a single caller,
+    the one that wins the rebuild lock, recomputes it while everyone else keeps serving the stale
+    payload. When there is no entry at all the other callers wait briefly for the rebuild.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and entry[0] > now:
+        increment(HITS_KEY)
+        return entry[1]
+
+    increment(MISSES_KEY)
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.AUCTION_CACHE_LOCK_TIMEOUT):
+        try:
+            value = build()
+            cache.set(key, (time.time() + timeout, value), timeout + settings.AUCTION_CACHE_GRACE_PERIOD)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry[1]
+
+    deadline = now + settings.AUCTION_CACHE_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return build()
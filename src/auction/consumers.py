@@ -0,0 +1,18 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import auction_group
+
+
+class AuctionConsumer(AsyncJsonWebsocketConsumer):
+    """Read-only stream of bids, price changes, time extensions and the closing result of one auction."""
+
+    async def connect(self):
+        self.group_name = auction_group(self.scope['url_route']['kwargs']['auction_id'])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def auction_event(self, event):
+        await self.send_json(event['payload'])
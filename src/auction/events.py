@@ -0,0 +1,28 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+EVENT_BID = 'bid'
+EVENT_EXTENDED = 'extended'
+EVENT_CLOSED = 'closed'
+EVENT_TICKET = 'ticket'
+
+
+def auction_group(auction_id):
+    return f'auction_{auction_id}'
+
+
+def publish_auction_event(auction_id, event, **data):
+    """
+    Push an event to every WebSocket subscribed to the auction once the current transaction commits.
+
+    The payload is built from values the caller already has, so fanning out to N subscribers costs
+    one message on the channel layer and no extra queries. The send is robust: a channel layer that
+    is down only loses the live update, not the on-commit work registered after it.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    message = {'type': 'auction.event', 'payload': {'event': event, 'auction_id': auction_id, **data}}
+    transaction.on_commit(lambda: async_to_sync(channel_layer.group_send)(auction_group(auction_id), message), robust=True)
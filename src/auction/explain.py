@@ -0,0 +1,41 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Auction, Bid, Chat, Notification, Transaction
+
+
+def hot_queries():
+    """The main query of each hot endpoint and task, filtered on the latest rows."""
+    auction = Auction.objects.order_by('-id').values('id').first() or {'id': 0}
+    bid = Bid.objects.order_by('-id').values('auction_id', 'bidder_id').first() or {'auction_id': 0, 'bidder_id': 0}
+    customer_id = bid['bidder_id']
+    now = timezone.now()
+
+    return {
+        'settlement': Auction.objects.filter(auction_status=Auction.AUCTION_ACTIVE, ending_time__lte=now).order_by('ending_time'),
+        'activation': Auction.objects.filter(auction_status=Auction.AUCTION_SCHEDULE, starting_time__lte=now).order_by(
+            'starting_time'
+        ),
+        'bidder bid': Bid.objects.filter(auction_id=bid['auction_id'], bidder_id=bid['bidder_id']),
+        'highest bid': Bid.objects.filter(auction_id=auction['id'], status=True).order_by('-amount'),
+        'auction chats': Chat.objects.filter(auction_id=auction['id']).order_by('created_date'),
+        'transactions': Transaction.objects.filter(user_id=customer_id).order_by('-created_at'),
+        'unread notifications': Notification.objects.filter(user_id=customer_id, is_read=False).order_by('-created_at'),
+    }
+
+
+def explain_hot_queries():
+    """
+    PostgreSQL plans of the hot queries, by name.
+
+    Small tables are scanned sequentially whatever indexes exist; disabling sequential scans makes
+    the planner fall back to one only when no index can serve the query.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return {name: queryset.explain() for name, queryset in hot_queries().items()}
+
+
+def sequential_scans(plans):
+    return [name for name, plan in plans.items() if 'Seq Scan' in plan]
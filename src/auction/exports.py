@@ -0,0 +1,76 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import Auction, Bid, Product, Transaction
+
+# Streaming counterpart of the import_export resources: rows are read with values_list() through a
+# server-side cursor and written to the response as they arrive, so memory stays flat whatever
+# the size of the table, where tablib would build the whole dataset first.
+
+EXPORT_FORMATS = ['csv', 'json']
+
+EXPORTS = {
+    'transactions': (
+        Transaction,
+        ['id', 'reference_id', 'user_id', 'invoice', 'amount', 'transaction_type', 'transaction_status', 'created_at'],
+    ),
+    'bids': (Bid, ['id', 'auction_id', 'bidder_id', 'amount', 'status', 'created_at', 'updated_at']),
+    'auctions': (
+        Auction,
+        [
+            'id',
+            'product_id',
+            'product__title',
+            'starting_price',
+            'current_price',
+            'starting_time',
+            'ending_time',
+            'auction_status',
+            'bids_count',
+            'created_at',
+        ],
+    ),
+    'products': (
+        Product,
+        ['id', 'title', 'slug', 'price', 'collection_id', 'customer_id', 'in_auction', 'created_at', 'updated_at'],
+    ),
+}
+
+
+class Echo:
+    """File-like object handing every line csv.writer writes straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields):
+    return queryset.order_by('pk').values_list(*fields).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def stream_csv(queryset, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in iter_rows(queryset, fields):
+        yield writer.writerow(row)
+
+
+def stream_json(queryset, fields):
+    separator = '['
+    for row in iter_rows(queryset, fields):
+        yield separator + json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder)
+        separator = ',\n'
+    yield ']' if separator == ',\n' else '[]'
+
+
+def export_response(queryset, fields, file_format, filename):
+    if file_format == 'json':
+        response = StreamingHttpResponse(stream_json(queryset, fields), content_type='application/json')
+    else:
+        response = StreamingHttpResponse(stream_csv(queryset, fields), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
@@ -1,8 +1,14 @@
 import django_filters
-from django.db.models import Count
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
 from django_filters.rest_framework import FilterSet
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.settings import api_settings
 
 from .models import Auction, Product, Transaction, WishlistItem
+from .search import search_enabled
 
 
 class ProductFilter(FilterSet):
@@ -32,12 +38,12 @@ class AuctionFilter(django_filters.FilterSet):
 
     def filter_bids_count_min(self, queryset, name, value):
         if value is not None:
-            return queryset.annotate(bids_count=Count('bids')).filter(bids_count__gte=value)
+            return queryset.filter(bids_count__gte=value)
         return queryset
 
     def filter_bids_count_max(self, queryset, name, value):
         if value is not None:
-            return queryset.annotate(bids_count=Count('bids')).filter(bids_count__lte=value)
+            return queryset.filter(bids_count__lte=value)
         return queryset
 
 
@@ -50,3 +56,39 @@ class TransactionFilter(django_filters.FilterSet):
             'amount': ['gt', 'lt'],
             'created_at': ['gt', 'lt'],
         }
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``?search=`` against the product search documents (GIN indexed), best matches first.
+
+    Views name the document column with ``search_vector_field``. The terms use web search syntax
+    ("quoted phrases", -excluded, or). Results are ranked unless ``?ordering=`` is given, which is
+    why this backend also answers the cursor paginator's get_ordering. Without PostgreSQL it
+    falls back to SearchFilter's icontains over ``search_fields``.
+    """
+
+    def is_ranked(self, request):
+        return (
+            search_enabled()
+            and bool(self.get_search_terms(request))
+            and not request.query_params.get(api_settings.ORDERING_PARAM)
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not search_enabled():
+            return super().filter_queryset(request, queryset, view)
+
+        field = getattr(view, 'search_vector_field', 'search_vector')
+        query = SearchQuery(' '.join(terms), search_type='websearch', config=settings.SEARCH_CONFIG)
+        # ts_rank is a float4; a double keeps cursor positions exact when they round trip as text
+        rank = Cast(SearchRank(F(field), query), FloatField())
+        return queryset.filter(**{field: query}).annotate(search_rank=rank)
+
+    def get_ordering(self, request, queryset, view):
+        if self.is_ranked(request):
+            return ['-search_rank']
+        if OrderingFilter in view.filter_backends:
+            return OrderingFilter().get_ordering(request, queryset, view)
+        return None
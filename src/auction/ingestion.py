@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from .bidding import BidRejected
+from .bidqueue import TICKET_QUEUED, enqueue_bid
+from .orderbook import BID_ACCEPTED, BID_TOO_LOW, INSUFFICIENT_BALANCE, submit_to_order_book
+
+# Bid ingestion modes shared by BidsViewSet and the async bid view, so both answer a bid the same
+# way whichever mode is enabled.
+
+
+def deferred_ingestion_enabled():
+    """Whether bids are handed to the bid queue or the order book instead of being placed in the request."""
+    return settings.AUCTION_BID_QUEUE_ENABLED or settings.AUCTION_ORDER_BOOK_ENABLED
+
+
+def submit_bid(request, auction_id, bidder_id, amount):
+    """Hand a validated bid to the enabled ingestion mode; returns the data, status code and headers of the response."""
+    if settings.AUCTION_BID_QUEUE_ENABLED:
+        # The bid is applied in order by the consumer of the auction's partition, see src/auction/bidqueue.py
+        ticket = enqueue_bid(auction_id, bidder_id, amount)
+        status_url = reverse('bid-tickets-detail', args=[ticket], request=request)
+        data = {'ticket': ticket, 'status': TICKET_QUEUED, 'auction_id': auction_id, 'amount': amount}
+        return data, status.HTTP_202_ACCEPTED, {'Location': status_url}
+
+    # Bids are ranked in the order book and written to the Bid table in batches
+    try:
+        result = submit_to_order_book(auction_id, bidder_id, amount)
+    except BidRejected as e:
+        return {'amount': [str(e)]}, status.HTTP_400_BAD_REQUEST, {}
+    if result == BID_ACCEPTED:
+        return {'auction_id': auction_id, 'amount': amount}, status.HTTP_202_ACCEPTED, {}
+    if result == BID_TOO_LOW:
+        return {'amount': ['Bid Amount Must be grater than the current bid amount']}, status.HTTP_400_BAD_REQUEST, {}
+    if result == INSUFFICIENT_BALANCE:
+        return {'amount': ["You don't have enough balance to bid"]}, status.HTTP_400_BAD_REQUEST, {}
+    return {'detail': 'Auction is not active.'}, status.HTTP_400_BAD_REQUEST, {}
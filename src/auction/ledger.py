@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Auction, LedgerEntry, UserCoin
+
+# Every coin movement is appended to the ledger in the same transaction as the UserCoin update it
+# explains, so the two cannot drift. UserCoin.balance stays the O(1) snapshot that reads and the
+# conditional "enough balance" check of the bid path use; the ledger is the history it is derived
+# from, which reconcile_ledger checks it against and can rebuild it from.
+#
+# Each entry moves coins between the available and held columns of one customer:
+#   opening / deposit / adjustment  available +x
+#   hold (bid placed or raised)     available -x, held +x
+#   release (bid lost)              available +x, held -x
+#   capture (bid won)               held -x, paired with a deposit of +x to the seller
+# so the held coins of an auction sum to zero once it has been settled.
+
+
+def hold(customer_id, amount, auction_id, bid_id):
+    return LedgerEntry(
+        customer_id=customer_id,
+        entry_type=LedgerEntry.ENTRY_TYPE_HOLD,
+        available=-amount,
+        held=amount,
+        auction_id=auction_id,
+        bid_id=bid_id,
+    )
+
+
+def release(customer_id, amount, auction_id, bid_id):
+    return LedgerEntry(
+        customer_id=customer_id,
+        entry_type=LedgerEntry.ENTRY_TYPE_RELEASE,
+        available=amount,
+        held=-amount,
+        auction_id=auction_id,
+        bid_id=bid_id,
+    )
+
+
+def capture(customer_id, amount, auction_id, bid_id):
+    return LedgerEntry(
+        customer_id=customer_id, entry_type=LedgerEntry.ENTRY_TYPE_CAPTURE, held=-amount, auction_id=auction_id, bid_id=bid_id
+    )
+
+
+def deposit(customer_id, amount, auction_id=None):
+    return LedgerEntry(
+        customer_id=customer_id, entry_type=LedgerEntry.ENTRY_TYPE_DEPOSIT, available=amount, auction_id=auction_id
+    )
+
+
+def open_account(customer_id, amount):
+    return LedgerEntry.objects.create(customer_id=customer_id, entry_type=LedgerEntry.ENTRY_TYPE_OPENING, available=amount)
+
+
+def adjust_balance(customer_id, amount):
+    """Credit (or debit, with a negative amount) a customer outside of any auction, e.g. from the admin."""
+    with transaction.atomic():
+        UserCoin.objects.filter(customer_id=customer_id).update(balance=F('balance') + amount, updated_at=timezone.now())
+        return LedgerEntry.objects.create(customer_id=customer_id, entry_type=LedgerEntry.ENTRY_TYPE_ADJUSTMENT, available=amount)
+
+
+def ledger_balances():
+    """Available balance of every customer according to the ledger, ordered by customer."""
+    return (
+        LedgerEntry.objects.order_by('customer_id')
+        .values('customer_id')
+        .annotate(balance=Sum('available'))
+        .values_list('customer_id', 'balance')
+    )
+
+
+def unsettled_escrow():
+    """Settled auctions whose held coins do not sum to zero, with the amount left in escrow."""
+    return (
+        LedgerEntry.objects.filter(auction__auction_status=Auction.AUCTION_COMPLETED)
+        .order_by('auction_id')
+        .values('auction_id')
+        .annotate(held=Sum('held'))
+        .exclude(held=0)
+        .values_list('auction_id', 'held')
+    )
+
+
+def materialize_balances(customer_ids):
+    """
+    Rewrite the UserCoin snapshots of these customers that drift from their ledger entries.
+
+    Bids and settlements append to the ledger and update UserCoin in one transaction, so once the
+    rows are locked (in customer order, like settlements do) nothing can move coins of these
+    customers. The drift is compared again and rewritten in one UPDATE under those locks, whose
+    snapshot is taken after they are held. Returns the number of balances rewritten.
+    """
+    total = LedgerEntry.objects.filter(customer_id=OuterRef('pk')).values('customer_id').annotate(total=Sum('available'))
+    expected = Coalesce(Subquery(total.values('total')), 0, output_field=DecimalField())
+    with transaction.atomic():
+        list(UserCoin.objects.select_for_update().filter(pk__in=customer_ids).order_by('pk').values_list('pk', flat=True))
+        return (
+            UserCoin.objects.filter(pk__in=customer_ids)
+            .exclude(balance=expected)
+            .update(balance=expected, updated_at=timezone.now())
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from src.auction.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counters of the auction payload cache.'
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        requests = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / requests if requests else 0
+        self.stdout.write(f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {ratio:.1%}")
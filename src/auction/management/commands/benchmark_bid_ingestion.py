@@ -0,0 +1,71 @@
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure bid throughput on a single hot auction against a running server. With queued bid ingestion enabled '
+        'the clock stops once every ticket has an outcome. Raise the bids_user and bids_auction throttle rates of the '
+        'server first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Base URL of the server, e.g. http://localhost:8000')
+        parser.add_argument('--auction', type=int, required=True, help='Auction to bid on')
+        parser.add_argument('--token', action='append', required=True, help='Access token of a bidder, repeatable')
+        parser.add_argument('--bids', type=int, default=1000, help='Bids to place')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent requests')
+        parser.add_argument('--start', type=int, default=1000, help='Amount of the first bid; each next bid is one higher')
+
+    def request(self, url, token, data=None):
+        body = json.dumps(data).encode() if data is not None else None
+        request = Request(url, data=body, headers={'Authorization': f'JWT {token}', 'Content-Type': 'application/json'})
+        try:
+            with urlopen(request, timeout=60) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except HTTPError as e:
+            return e.code, {}
+        except URLError as e:
+            raise CommandError(f'Cannot reach {url}: {e.reason}')
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        tokens = options['token']
+        bids_url = f"{base}/api/auctions/{options['auction']}/bids/"
+
+        def place(number):
+            token = tokens[number % len(tokens)]
+            status, body = self.request(bids_url, token, {'amount': options['start'] + number})
+            return status, token, body.get('ticket')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            responses = list(executor.map(place, range(options['bids'])))
+        submitted = time.perf_counter() - started
+
+        statuses = Counter(status for status, _, _ in responses)
+        tickets = [(token, ticket) for status, token, ticket in responses if status == 202 and ticket]
+        outcomes = Counter()
+        while tickets:
+            pending = []
+            for token, ticket in tickets:
+                status, body = self.request(f'{base}/api/bid-tickets/{ticket}/', token)
+                if status == 200 and body.get('status') == 'queued':
+                    pending.append((token, ticket))
+                else:
+                    outcomes[body.get('status', status)] += 1
+            tickets = pending
+            if tickets:
+                time.sleep(0.2)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{options['bids']} bids submitted in {submitted:.2f} s  statuses {dict(statuses)}")
+        if outcomes:
+            self.stdout.write(f'queued outcomes {dict(outcomes)}')
+        self.stdout.write(self.style.SUCCESS(f"throughput: {options['bids'] / elapsed:.0f} bids/s over {elapsed:.2f} s"))
@@ -0,0 +1,87 @@
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the bid latency of well-behaved bidders against a running server, alone and then while an abusive '
+        'client floods the same auction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Base URL of the server, e.g. http://localhost:8000')
+        parser.add_argument('--auction', type=int, required=True, help='Auction to bid on')
+        parser.add_argument('--token', action='append', required=True, help='Access token of a well-behaved bidder, repeatable')
+        parser.add_argument('--abuser-token', required=True, help='Access token of the abusive client')
+        parser.add_argument('--abuser-threads', type=int, default=32, help='Concurrent requests of the abusive client')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between bids of a well-behaved bidder')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds each phase lasts')
+
+    def bid(self, url, token, amount):
+        data = json.dumps({'amount': amount}).encode()
+        request = Request(url, data=data, headers={'Authorization': f'JWT {token}', 'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        try:
+            with urlopen(request, timeout=30) as response:
+                status = response.status
+        except HTTPError as e:
+            status = e.code
+        except URLError as e:
+            raise CommandError(f'Cannot reach {url}: {e.reason}')
+        return status, time.perf_counter() - started
+
+    def run_phase(self, url, options, abusive):
+        amounts = count(1)
+        stop = threading.Event()
+        latencies, statuses, abuser_statuses = [], Counter(), Counter()
+
+        def behave(token):
+            while not stop.is_set():
+                status, latency = self.bid(url, token, next(amounts))
+                latencies.append(latency)
+                statuses[status] += 1
+                stop.wait(options['interval'])
+
+        def abuse():
+            while not stop.is_set():
+                status, _ = self.bid(url, options['abuser_token'], next(amounts))
+                abuser_statuses[status] += 1
+
+        workers = len(options['token']) + (options['abuser_threads'] if abusive else 0)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(behave, token) for token in options['token']]
+            if abusive:
+                futures += [executor.submit(abuse) for _ in range(options['abuser_threads'])]
+            time.sleep(options['duration'])
+            stop.set()
+            for future in futures:
+                future.result()
+        return latencies, statuses, abuser_statuses
+
+    def report(self, name, latencies, statuses, abuser_statuses):
+        if not latencies:
+            self.stdout.write(f'{name}: no requests completed')
+            return
+        milliseconds = sorted(latency * 1000 for latency in latencies)
+        p95 = milliseconds[int(0.95 * (len(milliseconds) - 1))]
+        line = (
+            f'{name}: {len(milliseconds)} bids  p50 {statistics.median(milliseconds):.1f} ms  p95 {p95:.1f} ms  '
+            f'max {milliseconds[-1]:.1f} ms  statuses {dict(statuses)}'
+        )
+        if abuser_statuses:
+            line += f'  abuser statuses {dict(abuser_statuses)}'
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        url = f"{options['url'].rstrip('/')}/api/auctions/{options['auction']}/bids/"
+        for name, abusive in (('baseline', False), ('under abuse', True)):
+            self.report(name, *self.run_phase(url, options, abusive))
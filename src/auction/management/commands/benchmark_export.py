@@ -0,0 +1,71 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from src.auction.exports import EXPORT_FORMATS, EXPORTS, stream_csv, stream_json
+from src.auction.models import Customer, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the streaming export of a large transactions table and measure the memory it peaks at. Every fixture '
+        'is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000, help='Transactions to export')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, nargs='+', default=EXPORT_FORMATS, help='Formats to time')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows inserted per query while creating fixtures')
+        parser.add_argument(
+            '--trace-memory', action='store_true', help='Report the peak memory of the exporter, at several times the run time'
+        )
+
+    def create_transactions(self, count, batch_size):
+        [user] = get_user_model().objects.bulk_create(
+            [get_user_model()(username='export-benchmark', email='export-benchmark@example.com')]
+        )
+        # bulk_create skips the signals that create customers and their balances
+        customer = Customer.objects.create(user=user)
+        Transaction.objects.bulk_create(
+            (
+                Transaction(
+                    invoice=f'Export benchmark {i}',
+                    user=customer,
+                    amount=i % 1000 + 1,
+                    transaction_type=Transaction.TRANSACTION_TYPE_BID,
+                    transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
+                )
+                for i in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        return customer
+
+    def handle(self, *args, **options):
+        streams = {'csv': stream_csv, 'json': stream_json}
+        fields = EXPORTS['transactions'][1]
+        with transaction.atomic():
+            started = time.perf_counter()
+            customer = self.create_transactions(options['rows'], options['batch_size'])
+            self.stdout.write(f"{options['rows']} transactions created in {time.perf_counter() - started:.1f} s")
+
+            queryset = Transaction.objects.filter(user=customer)
+            for file_format in options['format']:
+                # The chunks are dropped as a response would send them: only what the exporter holds is traced
+                size = 0
+                if options['trace_memory']:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                for chunk in streams[file_format](queryset, fields):
+                    size += len(chunk)
+                elapsed = time.perf_counter() - started
+                report = f"{file_format}: {size / 2**20:.1f} MiB in {elapsed:.2f} s  {options['rows'] / elapsed:.0f} rows/s"
+                if options['trace_memory']:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    report += f'  peak {peak / 2**20:.1f} MiB'
+                self.stdout.write(report)
+            transaction.set_rollback(True)
@@ -0,0 +1,58 @@
+import csv
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from src.auction.models import Collection, Customer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time import_products on a generated CSV at several batch sizes, and count its queries. Every fixture and '
+        'import is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Products in the generated CSV')
+        parser.add_argument('--batch-size', type=int, nargs='+', default=[1000, 5000], help='Batch sizes to time')
+
+    def write_csv(self, file, rows, collection_id, customer_id):
+        writer = csv.writer(file)
+        writer.writerow(['title', 'description', 'price', 'collection', 'customer'])
+        # Titles repeat, as they do in real catalogues, so slugs only differ by their suffix
+        writer.writerows(
+            [f'Import benchmark {i % 1000}', f'Description {i}', f'{i % 500 + 1}.99', collection_id, customer_id]
+            for i in range(rows)
+        )
+        file.flush()
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), tempfile.NamedTemporaryFile('w', suffix='.csv', newline='') as file:
+            [user] = get_user_model().objects.bulk_create(
+                [get_user_model()(username='import-benchmark', email='import-benchmark@example.com')]
+            )
+            # bulk_create skips the signals that create customers and their balances
+            customer = Customer.objects.create(user=user)
+            collection = Collection.objects.create(title='Import benchmark')
+            self.write_csv(file, options['rows'], collection.id, customer.id)
+
+            for batch_size in options['batch_size']:
+                # Each run starts from the same table
+                with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    call_command('import_products', file.name, batch_size=batch_size, stdout=StringIO())
+                    elapsed = time.perf_counter() - started
+                    transaction.set_rollback(True)
+
+                batches = -(-options['rows'] // batch_size)
+                self.stdout.write(
+                    f"batches of {batch_size}: {options['rows']} products in {elapsed:.2f} s  "
+                    f"{options['rows'] / elapsed:.0f} rows/s  {len(queries)} queries  {len(queries) / batches:.1f} per batch"
+                )
+            transaction.set_rollback(True)
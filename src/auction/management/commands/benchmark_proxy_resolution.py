@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from src.auction.models import Auction, Collection, Customer, Product, ProxyBid
+from src.auction.proxy import resolve_proxies
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the resolution of one auction against a growing number of competing proxy bids. Every fixture is '
+        'created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proxies', type=int, nargs='+', default=[10, 100, 1000], help='Competing proxies per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Resolutions timed per run, each on a fresh auction')
+
+    def create_bidders(self, count):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'proxy-benchmark-{i}', email=f'proxy-benchmark-{i}@example.com') for i in range(count)
+        )
+        # bulk_create skips the signals that create customers and their balances
+        for user in users:
+            Customer.objects.create(user=user)
+        return list(Customer.objects.filter(user__in=users).values_list('id', flat=True))
+
+    def create_auction(self, seller_id, collection):
+        product = Product.objects.create(title='Proxy benchmark', customer_id=seller_id, collection=collection, price=100)
+        now = timezone.now()
+        return Auction.objects.create(
+            product=product,
+            starting_price=100,
+            current_price=100,
+            starting_time=now - timedelta(hours=1),
+            ending_time=now + timedelta(hours=1),
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            bidder_ids = self.create_bidders(max(options['proxies']) + 1)
+            seller_id = bidder_ids.pop()
+            collection = Collection.objects.create(title='Proxy benchmark')
+
+            for size in options['proxies']:
+                timings = []
+                for _ in range(options['repeat']):
+                    auction = self.create_auction(seller_id, collection)
+                    ProxyBid.objects.bulk_create(
+                        ProxyBid(auction=auction, bidder_id=bidder_id, max_amount=1000 + i)
+                        for i, bidder_id in enumerate(bidder_ids[:size])
+                    )
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        resolve_proxies(auction.id)
+                        timings.append(time.perf_counter() - started)
+
+                self.stdout.write(
+                    f'{size} proxies: best {min(timings) * 1000:.2f} ms  worst {max(timings) * 1000:.2f} ms  '
+                    f'{len(queries)} queries'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,104 @@
+import random
+import time
+from functools import reduce
+from operator import and_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from src.auction.models import Collection, Customer, Product
+from src.auction.search import refresh_search_vectors, search_enabled
+
+VOCABULARY = (
+    'vintage leather camera lens bag watch analog silver wooden chair lamp brass ceramic vase guitar acoustic record '
+    'vinyl jacket denim bicycle desk oak mirror clock pocket tripod film poster'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the substring search that SearchFilter falls back to with the ranked full-text search of '
+        'FullTextSearchFilter on a large product table. PostgreSQL only; every fixture is created in a transaction '
+        'that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000, help='Products to search')
+        parser.add_argument('--terms', nargs='+', default=['tripod', 'vintage camera', 'oak desk lamp'], help='Searches to time')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per search, the best one is reported')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows inserted per query while creating fixtures')
+
+    def create_products(self, count, batch_size):
+        [user] = get_user_model().objects.bulk_create(
+            [get_user_model()(username='search-benchmark', email='search-benchmark@example.com')]
+        )
+        # bulk_create skips the signals that create customers and their balances
+        customer = Customer.objects.create(user=user)
+        collection = Collection.objects.create(title='Search benchmark')
+        words = random.Random(0)
+        Product.objects.bulk_create(
+            (
+                Product(
+                    title=' '.join(words.sample(VOCABULARY, 3)),
+                    slug=f'search-benchmark-{i}',
+                    description=' '.join(words.choices(VOCABULARY, k=12)),
+                    customer=customer,
+                    collection=collection,
+                    price=100,
+                )
+                for i in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        # bulk_create skips the signal that fills the search documents in
+        refresh_search_vectors(Product.objects.filter(collection=collection))
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Product._meta.db_table}')
+
+    def substring_search(self, term):
+        # SearchFilter's semantics: every word must appear in one of ProductViewSet.search_fields
+        return Product.objects.filter(
+            reduce(
+                and_,
+                (
+                    Q(title__icontains=word) | Q(description__icontains=word) | Q(collection__title__icontains=word)
+                    for word in term.split()
+                ),
+            )
+        )
+
+    def full_text_search(self, term):
+        query = SearchQuery(term, search_type='websearch', config=settings.SEARCH_CONFIG)
+        return (
+            Product.objects.filter(search_vector=query)
+            .annotate(search_rank=SearchRank('search_vector', query))
+            .order_by('-search_rank')
+        )
+
+    def best_of(self, repeat, function):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000, result
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError('Full-text search documents are only maintained on PostgreSQL.')
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.create_products(options['products'], options['batch_size'])
+            self.stdout.write(f"{options['products']} products created and indexed in {time.perf_counter() - started:.1f} s")
+
+            for term in options['terms']:
+                for name, queryset in (('substring', self.substring_search(term)), ('full-text', self.full_text_search(term))):
+                    page, _ = self.best_of(options['repeat'], lambda: list(queryset.values_list('id', flat=True)[:20]))
+                    total, matches = self.best_of(options['repeat'], queryset.count)
+                    self.stdout.write(f'{term!r} {name}: first page {page:.1f} ms  count {total:.1f} ms  {matches} matches')
+            transaction.set_rollback(True)
@@ -0,0 +1,76 @@
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Path of each endpoint on the WSGI server (DRF views) and on the ASGI server (src/auction/async_views.py).
+# The sync list answers from its listing cache, the async one always queries
+ENDPOINTS = {
+    'list': ('/api/auctions/', '/api/async/auctions/'),
+    'detail': ('/api/auctions/{auction}/', '/api/async/auctions/{auction}/'),
+    'bids': ('/api/auctions/{auction}/bids/', '/api/async/auctions/{auction}/bids/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the read latency of the sync views under a WSGI server with the async views under an ASGI server, '
+        'at increasing concurrency. Start both against the same database first, e.g. '
+        '"gunicorn src.bidzone.wsgi -w 4 -b :8000" and "uvicorn src.bidzone.asgi:application --workers 4 --port 8001".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', required=True, help='Base URL of the WSGI server, e.g. http://localhost:8000')
+        parser.add_argument('--asgi', required=True, help='Base URL of the ASGI server, e.g. http://localhost:8001')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='bids', help='Endpoint to request')
+        parser.add_argument('--auction', type=int, help='Auction of the detail and bids endpoints')
+        parser.add_argument('--token', help='Access token sent with every request')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128], help='Concurrent requests per run')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per run')
+
+    def get(self, url, token):
+        headers = {'Authorization': f'JWT {token}'} if token else {}
+        started = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers), timeout=60) as response:
+                response.read()
+                status = response.status
+        except HTTPError as e:
+            status = e.code
+        except URLError as e:
+            raise CommandError(f'Cannot reach {url}: {e.reason}')
+        return status, time.perf_counter() - started
+
+    def run(self, url, token, concurrency, requests):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(lambda _: self.get(url, token), range(requests)))
+        return responses, time.perf_counter() - started
+
+    def report(self, name, concurrency, responses, elapsed):
+        milliseconds = sorted(latency * 1000 for _, latency in responses)
+        p99 = milliseconds[int(0.99 * (len(milliseconds) - 1))]
+        statuses = Counter(status for status, _ in responses)
+        self.stdout.write(
+            f'{name} x{concurrency}: {len(responses) / elapsed:.0f} req/s  p50 {statistics.median(milliseconds):.1f} ms  '
+            f'p99 {p99:.1f} ms  statuses {dict(statuses)}'
+        )
+
+    def handle(self, *args, **options):
+        paths = ENDPOINTS[options['endpoint']]
+        if options['endpoint'] != 'list' and options['auction'] is None:
+            raise CommandError(f"--auction is required for the {options['endpoint']} endpoint")
+
+        servers = [
+            (name, f"{options[name].rstrip('/')}{path.format(auction=options['auction'])}")
+            for name, path in zip(('wsgi', 'asgi'), paths)
+        ]
+        for concurrency in options['concurrency']:
+            for name, url in servers:
+                # One untimed request per run warms up connections and caches
+                self.get(url, options['token'])
+                self.report(name, concurrency, *self.run(url, options['token'], concurrency, options['requests']))
@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from src.auction.models import Auction, Bid, CoinHold, Collection, Customer, Product
+from src.auction.settlement import close_overdue_auctions
+from src.utils.slugs import generate_unique_slugs
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the settlement of many overdue auctions that each hold many bids, and count its queries. Every fixture '
+        'is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auctions', type=int, default=1000, help='Overdue auctions to settle')
+        parser.add_argument('--bids', type=int, default=200, help='Bids per auction, each from another bidder')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.AUCTION_SETTLEMENT_BATCH_SIZE, help='Auctions settled per transaction'
+        )
+
+    def create_bidders(self, count):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'settlement-benchmark-{i}', email=f'settlement-benchmark-{i}@example.com')
+            for i in range(count)
+        )
+        # bulk_create skips the signals that create customers and their balances
+        for user in users:
+            Customer.objects.create(user=user)
+        return list(Customer.objects.filter(user__in=users).values_list('id', flat=True))
+
+    def create_auctions(self, count, seller_id, current_price):
+        collection = Collection.objects.create(title='Settlement benchmark')
+        titles = [f'Settlement benchmark {i}' for i in range(count)]
+        products = Product.objects.bulk_create(
+            Product(title=title, slug=slug, customer_id=seller_id, collection=collection, price=100)
+            for title, slug in zip(titles, generate_unique_slugs(Product, titles))
+        )
+        now = timezone.now()
+        return Auction.objects.bulk_create(
+            Auction(
+                product=product,
+                starting_price=100,
+                current_price=current_price,
+                starting_time=now - timedelta(hours=1),
+                ending_time=now - timedelta(minutes=1),
+            )
+            for product in products
+        )
+
+    def create_bids(self, auctions, bidder_ids):
+        # Written straight to the tables: the bid path is not what is measured here
+        for auction in auctions:
+            Bid.objects.bulk_create(
+                Bid(auction=auction, bidder_id=bidder_id, amount=100 + i) for i, bidder_id in enumerate(bidder_ids, 1)
+            )
+            CoinHold.objects.bulk_create(
+                CoinHold(auction=auction, customer_id=bidder_id, amount=100 + i) for i, bidder_id in enumerate(bidder_ids, 1)
+            )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            bidder_ids = self.create_bidders(options['bids'] + 1)
+            seller_id = bidder_ids.pop()
+            # Bids run from 101 up, so the last one holds the current price
+            auctions = self.create_auctions(options['auctions'], seller_id, 100 + len(bidder_ids))
+            self.create_bids(auctions, bidder_ids)
+            self.stdout.write(f"{options['auctions']} overdue auctions with {options['bids']} bids each created")
+
+            # Overdue auctions already in the database are left alone
+            auction_ids = [auction.id for auction in auctions]
+            batches = settled = 0
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                while count := close_overdue_auctions(options['batch_size'], auction_ids=auction_ids):
+                    batches += 1
+                    settled += count
+                elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f'settled {settled} auctions in {batches} batches: {elapsed:.2f} s  '
+                f'{elapsed * 1000 / max(settled, 1):.2f} ms per auction  {len(queries)} queries  '
+                f'{len(queries) / max(batches, 1):.1f} queries per batch'
+            )
+            transaction.set_rollback(True)
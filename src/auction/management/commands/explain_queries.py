@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from src.auction.explain import explain_hot_queries, sequential_scans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the main query of each hot endpoint and task, and fail if any falls back to a sequential scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are only checked on PostgreSQL.')
+
+        plans = explain_hot_queries()
+        failures = sequential_scans(plans)
+        for name, plan in plans.items():
+            if options['verbose_plans']:
+                self.stdout.write(f'{name}:\n{plan}\n')
+            if name in failures:
+                self.stdout.write(self.style.ERROR(f'{name}: sequential scan\n{plan}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: index scan'))
+
+        if failures:
+            raise CommandError(f'Sequential scans in: {", ".join(failures)}')
@@ -0,0 +1,70 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from src.auction.models import Collection, Customer, Product
+from src.auction.search import refresh_search_vectors
+from src.utils.slugs import generate_unique_slugs
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a CSV file with title, description, price, collection and customer columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Products created per transaction')
+
+    def build_products(self, rows, line):
+        collection_ids = {row['collection'] for row in rows}
+        customer_ids = {row['customer'] for row in rows}
+        collections = {str(pk) for pk in Collection.objects.filter(pk__in=collection_ids).values_list('pk', flat=True)}
+        customers = {str(pk) for pk in Customer.objects.filter(pk__in=customer_ids).values_list('pk', flat=True)}
+
+        products = []
+        for number, row in enumerate(rows, line):
+            if row['collection'] not in collections:
+                raise CommandError(f'Line {number}: unknown collection {row["collection"]}')
+            if row['customer'] not in customers:
+                raise CommandError(f'Line {number}: unknown customer {row["customer"]}')
+            try:
+                price = Decimal(row['price'])
+            except InvalidOperation:
+                raise CommandError(f'Line {number}: invalid price {row["price"]}')
+            products.append(
+                Product(
+                    title=row['title'],
+                    description=row.get('description') or None,
+                    price=price,
+                    collection_id=row['collection'],
+                    customer_id=row['customer'],
+                )
+            )
+
+        for product, slug in zip(products, generate_unique_slugs(Product, [product.title for product in products])):
+            product.slug = slug
+        return products
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        imported = 0
+        with open(options['path'], newline='') as file:
+            reader = csv.DictReader(file)
+            missing = {'title', 'price', 'collection', 'customer'} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f'Missing columns: {", ".join(sorted(missing))}')
+
+            # Every batch costs four queries plus its INSERTs: collection and customer ids are checked in
+            # one lookup each, the slugs of the whole batch are generated with a single query and the
+            # search documents are filled in by one UPDATE.
+            while rows := list(islice(reader, batch_size)):
+                products = self.build_products(rows, imported + 2)
+                with transaction.atomic():
+                    Product.objects.bulk_create(products, batch_size=1000)
+                    refresh_search_vectors(Product.objects.filter(pk__in=[product.pk for product in products]))
+                imported += len(products)
+                self.stdout.write(f'{imported} products imported')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} products.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from src.auction.models import Auction
+from src.auction.orderbook import load_auction_book
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the live order book of active auctions from the Bid table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('auction_ids', nargs='*', type=int, help='Auctions to rebuild (default: all active auctions)')
+
+    def handle(self, *args, **options):
+        auction_ids = options['auction_ids']
+        if not auction_ids:
+            auction_ids = Auction.objects.filter(auction_status=Auction.AUCTION_ACTIVE).values_list('id', flat=True).iterator()
+
+        rebuilt = sum(1 for auction_id in auction_ids if load_auction_book(auction_id))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the order book of {rebuilt} auctions.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.auction.models import Product
+from src.auction.search import refresh_search_vectors, search_enabled
+
+
+class Command(BaseCommand):
+    help = 'Recompute the full-text search document of every product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Products updated per statement')
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError('Full-text search documents are only maintained on PostgreSQL.')
+
+        batch_size = options['batch_size']
+        last_id = 0
+        refreshed = 0
+        # Walk the primary key in ranges so each UPDATE stays short and locks a bounded set of rows
+        while True:
+            ids = list(Product.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            refreshed += refresh_search_vectors(Product.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]))
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search document of {refreshed} products.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from src.auction.bidding import refresh_auction_stats
+from src.auction.models import Auction
+
+
+class Command(BaseCommand):
+    help = 'Recompute bids_count, highest_bid and last_bid_at of auctions from the Bid table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('auction_ids', nargs='*', type=int, help='Auctions to repair (default: all auctions)')
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.all()
+        if options['auction_ids']:
+            auctions = auctions.filter(pk__in=options['auction_ids'])
+
+        repaired = refresh_auction_stats(auctions)
+        self.stdout.write(self.style.SUCCESS(f'Repaired the bid stats of {repaired} auctions.'))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0003_collection_slug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(blank=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['auction_status', 'starting_time'], name='auction_auc_auction_4604c5_idx'),
+        ),
+    ]
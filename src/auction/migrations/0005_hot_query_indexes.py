@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:01
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def merge_duplicate_bids(apps, schema_editor):
+    """
+    Keep only the highest bid of each bidder per auction before adding the unique constraint.
+
+    Every extra bid was charged in full when it was placed; those still open are refunded here,
+    with the matching refund transaction, settled ones were already refunded by the settlement task.
+    """
+    Bid = apps.get_model('auction', 'Bid')
+    Transaction = apps.get_model('auction', 'Transaction')
+    UserCoin = apps.get_model('auction', 'UserCoin')
+
+    previous = None
+    refunds = []
+    bids = Bid.objects.select_related('auction__product').order_by('auction_id', 'bidder_id', '-amount', '-created_at')
+    for bid in bids.iterator():
+        if (bid.auction_id, bid.bidder_id) != previous:
+            previous = (bid.auction_id, bid.bidder_id)
+            continue
+
+        if bid.status:
+            UserCoin.objects.filter(customer_id=bid.bidder_id).update(balance=F('balance') + bid.amount)
+            refunds.append(
+                Transaction(
+                    invoice=f'Refunded for the auction {bid.auction.product.title}',
+                    user_id=bid.bidder_id,
+                    amount=bid.amount,
+                    transaction_type='R',
+                    transaction_status='C',
+                )
+            )
+        bid.delete()
+    Transaction.objects.bulk_create(refunds, batch_size=1000)
+    # Check the deferred foreign keys of these writes now: PostgreSQL refuses the index and
+    # constraint DDL below while the transaction still has pending trigger events
+    schema_editor.connection.check_constraints()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0004_auction_status_starting_time_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_bids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['auction_status', 'ending_time'], name='auction_auc_auction_e7d903_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(
+                condition=models.Q(('auction_status', 'A')), fields=['ending_time'], name='auction_active_ending_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', 'status', 'amount'], name='auction_bid_auction_31e561_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['auction', 'created_date'], name='auction_cha_auction_ab8317_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='auction_not_user_id_9cf6d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at'], name='auction_tra_user_id_096f7f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bid',
+            constraint=models.UniqueConstraint(fields=('auction', 'bidder'), name='unique_bid_per_bidder'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_stats(apps, schema_editor):
+    Auction = apps.get_model('auction', 'Auction')
+    Bid = apps.get_model('auction', 'Bid')
+
+    bids = Bid.objects.filter(auction_id=OuterRef('pk'))
+    Auction.objects.update(
+        bids_count=Coalesce(Subquery(bids.values('auction_id').annotate(count=Count('id')).values('count')), 0),
+        highest_bid_id=Subquery(bids.order_by('-amount', 'created_at').values('id')[:1]),
+        last_bid_at=Subquery(bids.order_by('-updated_at').values('updated_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='bids_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='highest_bid',
+            field=models.ForeignKey(
+                blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auction.bid'
+            ),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['bids_count'], name='auction_auc_bids_co_5da829_idx'),
+        ),
+        migrations.RunPython(backfill_bid_stats, migrations.RunPython.noop),
+    ]
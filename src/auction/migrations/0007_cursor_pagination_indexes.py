@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0006_auction_bid_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='auction_tra_user_id_096f7f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['created_at', 'id'], name='auction_auc_created_51433b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['ending_time', 'id'], name='auction_auc_ending__a1d93e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['current_price', 'id'], name='auction_auc_current_472809_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', 'updated_at', 'id'], name='auction_bid_auction_056fc5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['customer', 'updated_at', 'id'], name='auction_pro_custome_88e711_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['auction', 'created_at', 'id'], name='auction_que_auction_b272e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='auction_tra_user_id_6b0634_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wishlistitem',
+            index=models.Index(fields=['wishlist', 'created_at', 'id'], name='auction_wis_wishlis_593d17_idx'),
+        ),
+    ]
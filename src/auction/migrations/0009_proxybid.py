@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0008_auction_soft_close'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProxyBid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'auction',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', to='auction.auction'
+                    ),
+                ),
+                ('bidder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='auction.customer')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['auction', 'active', '-max_amount', 'created_at'], name='auction_pro_auction_cd4c75_idx')
+                ],
+                'constraints': [models.UniqueConstraint(fields=('auction', 'bidder'), name='unique_proxy_bid_per_bidder')],
+            },
+        ),
+    ]
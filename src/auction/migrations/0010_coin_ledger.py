@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledger_accounts(apps, schema_editor):
+    # Current balances become opening entries, and coins already locked in the open bids of
+    # unsettled auctions are opened as held so their settlement balances the escrow.
+    UserCoin = apps.get_model('auction', 'UserCoin')
+    Bid = apps.get_model('auction', 'Bid')
+    LedgerEntry = apps.get_model('auction', 'LedgerEntry')
+
+    coins = UserCoin.objects.values_list('customer_id', 'balance').iterator(chunk_size=2000)
+    LedgerEntry.objects.bulk_create(
+        (LedgerEntry(customer_id=customer_id, entry_type='O', available=balance) for customer_id, balance in coins),
+        batch_size=2000,
+    )
+    bids = (
+        Bid.objects.filter(status=True)
+        .exclude(auction__auction_status='C')
+        .values_list('id', 'auction_id', 'bidder_id', 'amount')
+        .iterator(chunk_size=2000)
+    )
+    LedgerEntry.objects.bulk_create(
+        (
+            LedgerEntry(customer_id=bidder_id, entry_type='O', held=amount, auction_id=auction_id, bid_id=bid_id)
+            for bid_id, auction_id, bidder_id, amount in bids
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0009_proxybid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                (
+                    'entry_type',
+                    models.CharField(
+                        choices=[
+                            ('O', 'Opening balance'),
+                            ('H', 'Hold'),
+                            ('R', 'Release'),
+                            ('C', 'Capture'),
+                            ('D', 'Deposit'),
+                            ('A', 'Adjustment'),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                ('available', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('held', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'auction',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='+',
+                        to='auction.auction',
+                    ),
+                ),
+                (
+                    'bid',
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auction.bid'
+                    ),
+                ),
+                (
+                    'customer',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='auction.customer'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name_plural': 'ledger entries',
+                'indexes': [
+                    models.Index(fields=['customer', 'id'], name='auction_led_custome_fef386_idx'),
+                    models.Index(fields=['auction', 'id'], name='auction_led_auction_5bcf1f_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(open_ledger_accounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def hold_open_bids(apps, schema_editor):
+    Bid = apps.get_model('auction', 'Bid')
+    CoinHold = apps.get_model('auction', 'CoinHold')
+
+    bids = (
+        Bid.objects.filter(status=True)
+        .exclude(auction__auction_status='C')
+        .values_list('auction_id', 'bidder_id', 'amount')
+        .iterator(chunk_size=2000)
+    )
+    CoinHold.objects.bulk_create(
+        (CoinHold(auction_id=auction_id, customer_id=bidder_id, amount=amount) for auction_id, bidder_id, amount in bids),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0010_coin_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoinHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    'status',
+                    models.CharField(choices=[('H', 'Held'), ('C', 'Captured'), ('R', 'Released')], default='H', max_length=1),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'auction',
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='auction.auction'),
+                ),
+                (
+                    'customer',
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='auction.customer'),
+                ),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'status'], name='auction_coi_custome_7d350d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('auction', 'customer'), name='unique_hold_per_customer')],
+            },
+        ),
+        migrations.RunPython(hold_open_bids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0011_coin_holds'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='collection',
+            name='slug',
+            field=models.SlugField(blank=True, unique=True),
+        ),
+    ]
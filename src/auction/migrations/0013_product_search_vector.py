@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:18
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx')
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes and tsvector documents only exist on PostgreSQL; other databases fall back to SearchFilter
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('auction', 'Product')
+    Collection = apps.get_model('auction', 'Collection')
+    TaggedItem = apps.get_model('tags', 'TaggedItem')
+
+    collection_title = Collection.objects.filter(pk=OuterRef('collection_id')).values('title')
+    tag_labels = (
+        TaggedItem.objects.filter(content_type__app_label='auction', content_type__model='product', object_id=OuterRef('pk'))
+        .values('object_id')
+        .annotate(labels=StringAgg('tag__label', ' '))
+        .values('labels')
+    )
+    Product.objects.update(
+        search_vector=SearchVector('title', weight='A', config='english')
+        + SearchVector(Subquery(collection_title), weight='B', config='english')
+        + SearchVector(Subquery(tag_labels), weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    )
+    schema_editor.add_index(Product, SEARCH_VECTOR_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('auction', 'Product'), SEARCH_VECTOR_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0012_collection_slug_blank'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('tags', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='product', index=SEARCH_VECTOR_INDEX)],
+            database_operations=[migrations.RunPython(create_search_index, drop_search_index)],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+TRIGRAM_INDEXES = {
+    'collection': django.contrib.postgres.indexes.GinIndex(
+        fields=['title'], name='collection_title_trgm_idx', opclasses=['gin_trgm_ops']
+    ),
+    'product': django.contrib.postgres.indexes.GinIndex(
+        fields=['title'], name='product_title_trgm_idx', opclasses=['gin_trgm_ops']
+    ),
+}
+
+
+def add_trigram_indexes(apps, schema_editor):
+    # pg_trgm only exists on PostgreSQL; other databases serve suggestions from a prefix trie
+    if schema_editor.connection.vendor == 'postgresql':
+        for model_name, index in TRIGRAM_INDEXES.items():
+            schema_editor.add_index(apps.get_model('auction', model_name), index)
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for model_name, index in TRIGRAM_INDEXES.items():
+            schema_editor.remove_index(apps.get_model('auction', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0013_product_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in TRIGRAM_INDEXES.items()
+            ],
+            database_operations=[migrations.RunPython(add_trigram_indexes, remove_trigram_indexes)],
+        ),
+    ]
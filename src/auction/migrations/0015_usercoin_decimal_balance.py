@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0014_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usercoin',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=10000, max_digits=12),
+        ),
+        migrations.AddConstraint(
+            model_name='usercoin',
+            constraint=models.CheckConstraint(condition=models.Q(('balance__gte', 0)), name='non_negative_balance'),
+        ),
+    ]
@@ -3,10 +3,12 @@ from uuid import uuid4
 
 from django.conf import settings
 from django.contrib import admin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
-from src.utils.slugs import generate_unique_slug
+from src.utils.slugs import save_with_unique_slug
 
 from .validators import validate_file_size
 
@@ -19,12 +21,20 @@ class Promotion(models.Model):
 class Collection(models.Model):
     title = models.CharField(max_length=30)
     feaured_product = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
-    slug = models.SlugField(unique=True)
+    slug = models.SlugField(unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+        return save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
+
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='collection_title_trgm_idx')]
+
 
 class Customer(models.Model):
     MEMBERSHIP_BRONZE = 'B'
@@ -67,7 +77,7 @@ class Customer(models.Model):
 
 class UserCoin(models.Model):
     customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='balance', primary_key=True)
-    balance = models.PositiveIntegerField(default=10000)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=10000)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -76,6 +86,7 @@ class UserCoin(models.Model):
 
     class Meta:
         ordering = ['customer']
+        constraints = [models.CheckConstraint(condition=models.Q(balance__gte=0), name='non_negative_balance')]
 
 
 class Address(models.Model):
@@ -105,19 +116,25 @@ class Product(models.Model):
     collection = models.ForeignKey(Collection, on_delete=models.PROTECT, related_name='products')
     in_auction = models.BooleanField(default=False)
     promotion = models.ManyToManyField(Promotion, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)  # maintained by src/auction/search.py
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.title)
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        return save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['customer', 'updated_at', 'id']),
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='product_title_trgm_idx'),
+        ]
 
 
 class Auction(models.Model):
@@ -141,6 +158,13 @@ class Auction(models.Model):
     starting_time = models.DateTimeField()
     ending_time = models.DateTimeField()
     auction_status = models.CharField(max_length=1, choices=AUCTION_STATUS_CHOICES, default=AUCTION_ACTIVE)
+    # Soft close: a bid placed in the last `soft_close_window` pushes ending_time back by `soft_close_extension`
+    soft_close_window = models.DurationField(null=True, blank=True)
+    soft_close_extension = models.DurationField(null=True, blank=True)
+    # Denormalized from Bid, kept up to date by the bid path (see src/auction/bidding.py)
+    bids_count = models.PositiveIntegerField(default=0)
+    highest_bid = models.ForeignKey('Bid', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_bid_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -149,6 +173,16 @@ class Auction(models.Model):
 
     class Meta:
         ordering = ['product']
+        indexes = [
+            models.Index(fields=['auction_status', 'starting_time']),
+            models.Index(fields=['auction_status', 'ending_time']),
+            models.Index(fields=['ending_time'], condition=models.Q(auction_status='A'), name='auction_active_ending_idx'),
+            models.Index(fields=['bids_count']),
+            # Keys of the cursor paginated auction feed
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['ending_time', 'id']),
+            models.Index(fields=['current_price', 'id']),
+        ]
 
 
 class Bid(models.Model):
@@ -164,6 +198,56 @@ class Bid(models.Model):
 
     class Meta:
         ordering = ['auction']
+        constraints = [models.UniqueConstraint(fields=['auction', 'bidder'], name='unique_bid_per_bidder')]
+        indexes = [
+            models.Index(fields=['auction', 'status', 'amount']),
+            models.Index(fields=['auction', 'updated_at', 'id']),
+        ]
+
+
+# Coins a bidder has locked in one auction, i.e. the amount of their bid until the auction is settled
+class CoinHold(models.Model):
+    HOLD_STATUS_HELD = 'H'
+    HOLD_STATUS_CAPTURED = 'C'
+    HOLD_STATUS_RELEASED = 'R'
+
+    HOLD_STATUS_CHOICES = [
+        (HOLD_STATUS_HELD, 'Held'),
+        (HOLD_STATUS_CAPTURED, 'Captured'),
+        (HOLD_STATUS_RELEASED, 'Released'),
+    ]
+
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='holds')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='holds')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=1, choices=HOLD_STATUS_CHOICES, default=HOLD_STATUS_HELD)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return (
+            f'{self.get_status_display()} {self.amount} of {self.customer.user.get_username()} for {self.auction.product.title}'
+        )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['auction', 'customer'], name='unique_hold_per_customer')]
+        indexes = [models.Index(fields=['customer', 'status'])]
+
+
+class ProxyBid(models.Model):
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='proxy_bids')
+    bidder = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    active = models.BooleanField(default=True)  # False once the bidder could not fund a bid
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.bidder.user.get_username()} bids up to {self.max_amount} for {self.auction.product.title}'
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['auction', 'bidder'], name='unique_proxy_bid_per_bidder')]
+        indexes = [models.Index(fields=['auction', 'active', '-max_amount', 'created_at'])]
 
 
 class ProductImage(models.Model):
@@ -194,6 +278,9 @@ class WishlistItem(models.Model):
     # def __str__(self):
     #     return f"{self.product.title}"
 
+    class Meta:
+        indexes = [models.Index(fields=['wishlist', 'created_at', 'id'])]
+
 
 class Delivery(models.Model):
     DELIVERY_STATUS_PENDING = 'P'
@@ -245,6 +332,9 @@ class Chat(models.Model):
     def __str__(self):
         return f'Chat on {self.auction.product.title} by {self.customer.user.get_username()}'
 
+    class Meta:
+        indexes = [models.Index(fields=['auction', 'created_date'])]
+
 
 class Transaction(models.Model):
     TRANSACTION_TYPE_DEPOSITE = 'D'
@@ -278,6 +368,43 @@ class Transaction(models.Model):
     def __str__(self):
         return f'{self.transaction_type} of {self.amount} by {self.user.user.get_username()}'
 
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at', 'id'])]
+
+
+# Append-only record of every coin movement. UserCoin.balance is a snapshot of the available column.
+class LedgerEntry(models.Model):
+    ENTRY_TYPE_OPENING = 'O'
+    ENTRY_TYPE_HOLD = 'H'
+    ENTRY_TYPE_RELEASE = 'R'
+    ENTRY_TYPE_CAPTURE = 'C'
+    ENTRY_TYPE_DEPOSIT = 'D'
+    ENTRY_TYPE_ADJUSTMENT = 'A'
+
+    ENTRY_TYPE_CHOICES = [
+        (ENTRY_TYPE_OPENING, 'Opening balance'),
+        (ENTRY_TYPE_HOLD, 'Hold'),
+        (ENTRY_TYPE_RELEASE, 'Release'),
+        (ENTRY_TYPE_CAPTURE, 'Capture'),
+        (ENTRY_TYPE_DEPOSIT, 'Deposit'),
+        (ENTRY_TYPE_ADJUSTMENT, 'Adjustment'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=1, choices=ENTRY_TYPE_CHOICES)
+    available = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # change of the spendable balance
+    held = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # change of the coins locked in bids
+    auction = models.ForeignKey(Auction, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    bid = models.ForeignKey(Bid, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.get_entry_type_display()} of {self.available}/{self.held} for {self.customer.user.get_username()}'
+
+    class Meta:
+        verbose_name_plural = 'ledger entries'
+        indexes = [models.Index(fields=['customer', 'id']), models.Index(fields=['auction', 'id'])]
+
 
 # Question and answer model for auction product
 class Question(models.Model):
@@ -290,6 +417,9 @@ class Question(models.Model):
     def __str__(self):
         return f'Question by {self.customer.user.get_username()} for {self.auction.product.title}'
 
+    class Meta:
+        indexes = [models.Index(fields=['auction', 'created_at', 'id'])]
+
 
 class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
@@ -322,3 +452,6 @@ class Notification(models.Model):
 
     def __str__(self):
         return f'{self.notification_type} notification for {self.user.user.get_username()}'
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'is_read', 'created_at'])]
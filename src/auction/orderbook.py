@@ -0,0 +1,309 @@
+import os
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from decimal import Decimal
+from functools import lru_cache
+from itertools import count
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .bidding import BidRejected, check_auction_window, place_bid
+from .models import Auction, Bid, UserCoin
+from .proxy import resolve_proxies
+
+# KEYS: ranked bids, floor price, pending write-behind stream, reserved coins per bidder
+# ARGV: bidder id, amount, amount in cents, bidder's balance in cents, auction id
+SUBMIT_BID_SCRIPT = """
+local floor = redis.call('GET', KEYS[2])
+if not floor then
+    return -1
+end
+local best = tonumber(floor)
+local top = redis.call('ZREVRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if top[2] and tonumber(top[2]) > best then
+    best = tonumber(top[2])
+end
+if tonumber(ARGV[2]) <= best then
+    return 0
+end
+local charge = tonumber(ARGV[3])
+local own = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if own then
+    charge = charge - math.floor(tonumber(own) * 100 + 0.5)
+end
+local reserved = tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0')
+if reserved + charge > tonumber(ARGV[4]) then
+    return 2
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('HINCRBY', KEYS[4], ARGV[1], charge)
+redis.call('XADD', KEYS[3], '*', 'auction_id', ARGV[5], 'bidder_id', ARGV[1], 'amount', ARGV[2], 'charge', charge)
+return 1
+"""
+
+# KEYS: pending write-behind stream, reserved coins per bidder
+# ARGV: consumer group, then triples of entry id, bidder id and charge in cents
+ACK_SCRIPT = """
+for i = 2, #ARGV, 3 do
+    if redis.call('XACK', KEYS[1], ARGV[1], ARGV[i]) == 1 then
+        redis.call('XDEL', KEYS[1], ARGV[i])
+        if redis.call('HINCRBY', KEYS[2], ARGV[i + 1], -tonumber(ARGV[i + 2])) <= 0 then
+            redis.call('HDEL', KEYS[2], ARGV[i + 1])
+        end
+    end
+end
+"""
+
+BOOK_NOT_LOADED = -1
+BID_TOO_LOW = 0
+BID_ACCEPTED = 1
+INSUFFICIENT_BALANCE = 2
+
+
+def to_cents(amount):
+    return int(Decimal(amount) * 100)
+
+
+class RedisOrderBook:
+    """
+    Ranked bids of live auctions kept in one sorted set per auction.
+
+    A bid is accepted only if it beats both the floor (the auction's current price when the book
+    was loaded) and the top of the book, and if the bidder can pay for it: the coins of their bids
+    still waiting to be written behind are reserved, and the new charge (the raise over their own
+    entry in the book) must fit in their balance next to them. The checks, the insert and the
+    write-behind enqueue run in a single Lua script, so concurrent bidders are ranked atomically
+    without touching Postgres.
+
+    Accepted bids wait in a stream read through a consumer group: a flusher claims a batch, writes
+    it to the database and only acknowledges (and deletes) the entries once that transaction has
+    committed. Entries of a flusher that died mid-batch stay pending in the group and are claimed
+    again by the next flusher once they have been idle for AUCTION_ORDER_BOOK_CLAIM_IDLE seconds.
+    """
+
+    pending_key = 'orderbook:pending'
+    reserved_key = 'orderbook:reserved'
+    group = 'flushers'
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+        self.submit_script = self.client.register_script(SUBMIT_BID_SCRIPT)
+        self.ack_script = self.client.register_script(ACK_SCRIPT)
+        try:
+            self.client.xgroup_create(self.pending_key, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    @property
+    def consumer(self):
+        # Worker processes are forked after the book is created, so the name is resolved per call
+        return f'{socket.gethostname()}-{os.getpid()}'
+
+    def bids_key(self, auction_id):
+        return f'orderbook:{auction_id}:bids'
+
+    def floor_key(self, auction_id):
+        return f'orderbook:{auction_id}:floor'
+
+    def load(self, auction_id, floor, bids):
+        pipe = self.client.pipeline()
+        pipe.delete(self.bids_key(auction_id))
+        if bids:
+            pipe.zadd(self.bids_key(auction_id), {str(bidder_id): float(amount) for bidder_id, amount in bids})
+        pipe.set(self.floor_key(auction_id), str(floor))
+        pipe.execute()
+
+    def submit(self, auction_id, bidder_id, amount, balance):
+        keys = [self.bids_key(auction_id), self.floor_key(auction_id), self.pending_key, self.reserved_key]
+        args = [bidder_id, str(amount), to_cents(amount), to_cents(balance), auction_id]
+        return int(self.submit_script(keys=keys, args=args))
+
+    def ranked(self, auction_id, limit=10):
+        rows = self.client.zrevrange(self.bids_key(auction_id), 0, limit - 1, withscores=True)
+        return [(int(bidder_id), Decimal(str(score))) for bidder_id, score in rows]
+
+    def claim_pending(self, limit):
+        """Up to ``limit`` pending bids, oldest first: abandoned ones idle long enough, then new ones."""
+        idle = int(settings.AUCTION_ORDER_BOOK_CLAIM_IDLE * 1000)
+        _, messages, *_ = self.client.xautoclaim(self.pending_key, self.group, self.consumer, idle, '0-0', count=limit)
+        if len(messages) < limit:
+            streams = {self.pending_key: '>'}
+            for _, new_messages in self.client.xreadgroup(self.group, self.consumer, streams, count=limit - len(messages)):
+                messages += new_messages
+        return [
+            {
+                'id': message_id.decode(),
+                'auction_id': int(fields[b'auction_id']),
+                'bidder_id': int(fields[b'bidder_id']),
+                'amount': fields[b'amount'].decode(),
+                'charge': int(fields[b'charge']),
+            }
+            for message_id, fields in messages
+            if fields
+        ]
+
+    def ack(self, entries):
+        """Drop entries that have been written behind and give back the coins they reserved."""
+        args = [value for entry in entries for value in (entry['id'], entry['bidder_id'], entry['charge'])]
+        if args:
+            self.ack_script(keys=[self.pending_key, self.reserved_key], args=[self.group, *args])
+
+    def pending_count(self):
+        return self.client.xlen(self.pending_key)
+
+    def clear(self, auction_id):
+        self.client.delete(self.bids_key(auction_id), self.floor_key(auction_id))
+
+
+class InMemoryOrderBook:
+    """Process-local stand-in for RedisOrderBook, used for tests and local development."""
+
+    def __init__(self, url=None):
+        self.lock = threading.Lock()
+        self.books = {}
+        self.floors = {}
+        self.ids = count(1)
+        self.pending = deque()
+        self.claimed = {}  # entry id -> (claimed at, entry), until acknowledged
+        self.reserved = defaultdict(int)
+
+    def load(self, auction_id, floor, bids):
+        with self.lock:
+            self.books[auction_id] = {bidder_id: Decimal(amount) for bidder_id, amount in bids}
+            self.floors[auction_id] = Decimal(floor)
+
+    def submit(self, auction_id, bidder_id, amount, balance):
+        with self.lock:
+            if auction_id not in self.floors:
+                return BOOK_NOT_LOADED
+
+            book = self.books[auction_id]
+            if amount <= max([self.floors[auction_id], *book.values()]):
+                return BID_TOO_LOW
+
+            charge = to_cents(amount) - to_cents(book.get(bidder_id, 0))
+            if self.reserved[bidder_id] + charge > to_cents(balance):
+                return INSUFFICIENT_BALANCE
+
+            book[bidder_id] = Decimal(amount)
+            self.reserved[bidder_id] += charge
+            self.pending.append(
+                {'id': next(self.ids), 'auction_id': auction_id, 'bidder_id': bidder_id, 'amount': str(amount), 'charge': charge}
+            )
+            return BID_ACCEPTED
+
+    def ranked(self, auction_id, limit=10):
+        book = self.books.get(auction_id, {})
+        return sorted(book.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def claim_pending(self, limit):
+        with self.lock:
+            now = time.monotonic()
+            idle = settings.AUCTION_ORDER_BOOK_CLAIM_IDLE
+            entries = [entry for claimed_at, entry in self.claimed.values() if now - claimed_at >= idle][:limit]
+            while len(entries) < limit and self.pending:
+                entries.append(self.pending.popleft())
+            for entry in entries:
+                self.claimed[entry['id']] = (now, entry)
+            return entries
+
+    def ack(self, entries):
+        with self.lock:
+            for entry in entries:
+                if self.claimed.pop(entry['id'], None) is None:
+                    continue
+                self.reserved[entry['bidder_id']] -= entry['charge']
+                if self.reserved[entry['bidder_id']] <= 0:
+                    del self.reserved[entry['bidder_id']]
+
+    def pending_count(self):
+        return len(self.pending) + len(self.claimed)
+
+    def clear(self, auction_id):
+        with self.lock:
+            self.books.pop(auction_id, None)
+            self.floors.pop(auction_id, None)
+
+
+@lru_cache(maxsize=None)
+def get_order_book():
+    backend = import_string(settings.AUCTION_ORDER_BOOK_BACKEND)
+    return backend(settings.AUCTION_REDIS_URL)
+
+
+def load_auction_book(auction_id):
+    """Rebuild the book of one auction from the Bid table. Returns False if it is not active."""
+    book = get_order_book()
+    auction = Auction.objects.filter(pk=auction_id, auction_status=Auction.AUCTION_ACTIVE).values('current_price').first()
+    if auction is None:
+        book.clear(auction_id)
+        return False
+
+    bids = Bid.objects.filter(auction_id=auction_id, status=True).values_list('bidder_id', 'amount')
+    book.load(auction_id, auction['current_price'], list(bids))
+    return True
+
+
+def submit_to_order_book(auction_id, bidder_id, amount):
+    """
+    Rank a bid in the book of its auction, loading the book first if needed. Returns the result code.
+
+    The book only compares amounts, so the auction's window is checked first, against the same
+    cached window as place_bid, which raises BidRejected outside of it. The bidder's balance is
+    read from their committed UserCoin row; the book adds the coins of their bids that are not
+    written behind yet before comparing.
+    """
+    check_auction_window(auction_id, timezone.now())
+    balance = UserCoin.objects.filter(customer_id=bidder_id).values_list('balance', flat=True).first() or 0
+    book = get_order_book()
+    result = book.submit(auction_id, bidder_id, amount, balance)
+    if result == BOOK_NOT_LOADED and load_auction_book(auction_id):
+        result = book.submit(auction_id, bidder_id, amount, balance)
+    return result
+
+
+def flush_pending_bids(limit):
+    """
+    Write accepted bids behind to the Bid table in one transaction per batch.
+
+    Bids the database rejects (e.g. the bidder ran out of coins) are dropped, and the books of
+    their auctions are rebuilt from the Bid table so they rank what was actually committed. The
+    batch is acknowledged, and the coins the book reserved for it released, only once it has
+    committed: if the flusher dies before that, the batch is claimed again later. Replaying a bid
+    that was already committed is harmless, the database rejects it as not higher than itself.
+    """
+    book = get_order_book()
+    entries = book.claim_pending(limit)
+    if not entries:
+        return 0
+
+    titles = dict(Auction.objects.filter(pk__in={entry['auction_id'] for entry in entries}).values_list('id', 'product__title'))
+    stale = set()
+    with transaction.atomic():
+        for entry in entries:
+            try:
+                place_bid(
+                    entry['auction_id'],
+                    entry['bidder_id'],
+                    Decimal(entry['amount']),
+                    invoice=f"Bids on {titles.get(entry['auction_id'])}",
+                )
+            except BidRejected:
+                stale.add(entry['auction_id'])
+        transaction.on_commit(lambda: book.ack(entries))
+
+    # Proxy bids are written straight to the database, so the book has to catch up with them
+    for auction_id in titles:
+        if resolve_proxies(auction_id, invoice=f'Proxy bid on {titles[auction_id]}'):
+            stale.add(auction_id)
+
+    for auction_id in stale:
+        load_auction_book(auction_id)
+    return len(entries)
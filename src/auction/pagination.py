@@ -1,5 +1,48 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    Keyset pagination: each page is an index range scan from the previous position, with no OFFSET
+    and no COUNT(*). The ordering (picked by OrderingFilter or the class default) always ends with
+    the primary key so positions are unique. Pass ``?count=true`` to also get the total count.
+    """
+
+    ordering = '-created_at'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
+
+
+class UpdatedCursorPagination(DefaultCursorPagination):
+    ordering = '-updated_at'
@@ -0,0 +1,47 @@
+from django.conf import settings
+
+from .bidding import BidRejected, InsufficientBalance, place_bid
+from .models import Auction, ProxyBid
+
+
+def resolve_proxies(auction_id, invoice=''):
+    """
+    Bid on behalf of the proxies of an auction, the way an auctioneer would after a new bid.
+
+    Only the two highest active proxies matter: the leading one outbids everyone else by one
+    increment (second price plus increment, capped at its own maximum) and the others could never
+    win, so competing proxies are settled in one pass that writes at most one bid instead of
+    replaying the bidding war increment by increment. Ties go to the earliest proxy. A proxy whose
+    bidder cannot fund the bid is deactivated and the next one is tried. Returns the placed bid, or
+    None when the current leader already holds the auction.
+    """
+    auction = Auction.objects.filter(pk=auction_id).values('current_price', 'highest_bid__bidder_id').first()
+    if auction is None:
+        return None
+    current_price = auction['current_price']
+    leader_id = auction['highest_bid__bidder_id']
+
+    while True:
+        proxies = list(
+            ProxyBid.objects.filter(auction_id=auction_id, active=True, max_amount__gt=current_price)
+            .order_by('-max_amount', 'created_at')
+            .values_list('id', 'bidder_id', 'max_amount')[:2]
+        )
+        if not proxies:
+            return None
+
+        proxy_id, bidder_id, max_amount = proxies[0]
+        if len(proxies) > 1:
+            competing = proxies[1][2]
+        elif bidder_id != leader_id:
+            competing = current_price
+        else:
+            return None
+
+        try:
+            return place_bid(auction_id, bidder_id, min(max_amount, competing + settings.AUCTION_BID_INCREMENT), invoice=invoice)
+        except InsufficientBalance:
+            ProxyBid.objects.filter(pk=proxy_id).update(active=False)
+        except BidRejected:
+            # The auction closed or a higher bid got in first; that bid resolves the proxies itself
+            return None
@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+from rest_framework import serializers
+
+# The query plan of a serializer is the select_related/prefetch_related lookups it needs to render
+# any number of rows in a constant number of queries. It is read off the serializer itself: nested
+# serializers over a foreign key or one-to-one are joined, nested lists and many-valued relations are
+# prefetched, and so is everything below a prefetched relation. What a serializer reads through model
+# properties or method fields cannot be seen from its fields, so it is declared in its Meta as
+# ``select_related`` / ``prefetch_related``, relative to the serializer's model.
+
+
+def get_relation(model, attr):
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        name = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if name == attr:
+            return field
+    return None
+
+
+def collect(serializer, model, prefix, prefetching, select, prefetch):
+    meta = getattr(serializer, 'Meta', None)
+    for lookup in getattr(meta, 'select_related', []):
+        (prefetch if prefetching else select).add(prefix + lookup)
+    for lookup in getattr(meta, 'prefetch_related', []):
+        prefetch.add(prefix + lookup)
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        renders_relation = isinstance(nested, serializers.BaseSerializer) or isinstance(field, serializers.ManyRelatedField)
+
+        current, path, many = model, prefix, prefetching
+        for index, attr in enumerate(field.source_attrs):
+            relation = get_relation(current, attr)
+            # Related fields render the last relation from its *_id column: only follow it when it is nested
+            if relation is None or (index == len(field.source_attrs) - 1 and not renders_relation):
+                break
+            path += attr
+            many = many or relation.many_to_many or relation.one_to_many
+            (prefetch if many else select).add(path)
+            current, path = relation.related_model, path + '__'
+        else:
+            if isinstance(nested, serializers.ModelSerializer):
+                collect(nested, current, path, many, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def query_plan(serializer_class):
+    """The ``(select_related, prefetch_related)`` lookups needed to render ``serializer_class``."""
+    select, prefetch = set(), set()
+    meta = getattr(serializer_class, 'Meta', None)
+    if getattr(meta, 'model', None) is not None:
+        collect(serializer_class(), meta.model, '', False, select, prefetch)
+    return sorted(select), sorted(prefetch)
+
+
+def apply_query_plan(queryset, serializer_class):
+    select, prefetch = query_plan(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class QueryPlanMixin:
+    """Render every queryset of the viewset with the query plan of its serializer."""
+
+    def filter_queryset(self, queryset):
+        return apply_query_plan(super().filter_queryset(queryset), self.get_serializer_class())
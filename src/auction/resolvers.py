@@ -0,0 +1,34 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import Auction, Customer
+
+# The customer behind a request is resolved at most once: access tokens carry it in their
+# ``customer_id`` claim (see src.core.serializers.TokenObtainPairSerializer), older tokens and other
+# authentication schemes fall back to one lookup, and either way the result is kept on the request.
+
+
+def get_customer_id(request):
+    if not hasattr(request, '_customer_id'):
+        customer_id = request.auth.get('customer_id') if hasattr(request.auth, 'get') else None
+        if customer_id is None and request.user.is_authenticated:
+            customer_id = Customer.objects.filter(user_id=request.user.id).values_list('id', flat=True).first()
+        request._customer_id = customer_id
+    return request._customer_id
+
+
+def get_customer(request):
+    """The customer of the request with its user and balance, loaded with a single query."""
+    if not hasattr(request, '_customer'):
+        customer_id = get_customer_id(request)
+        customers = Customer.objects.select_related('user', 'balance')
+        request._customer = customers.filter(pk=customer_id).first() if customer_id is not None else None
+    return request._customer
+
+
+def get_auction_title(auction_id):
+    return Auction.objects.filter(pk=auction_id).values_list('product__title', flat=True).first() or ''
+
+
+def lazy_auction_title(auction_id):
+    """The auction title for invoice texts, only queried when a bid is actually written."""
+    return SimpleLazyObject(lambda: get_auction_title(auction_id))
@@ -1,11 +1,47 @@
-from import_export import resources
+from import_export import fields, resources, widgets
+from import_export.instance_loaders import CachedInstanceLoader
 
-from .models import Auction, Product
+from src.utils.slugs import generate_unique_slugs
+
+from .models import Auction, Collection, Customer, Product
+from .search import refresh_search_vectors
 
 
 class ProductResource(resources.ModelResource):
+    # Foreign keys are imported as raw ids and checked once per import in before_import, instead of
+    # one lookup per row and column
+    collection = fields.Field(attribute='collection_id', column_name='collection', widget=widgets.IntegerWidget())
+    customer = fields.Field(attribute='customer_id', column_name='customer', widget=widgets.IntegerWidget())
+
     class Meta:
         model = Product
+        use_bulk = True
+        batch_size = 1000
+        skip_diff = True
+        instance_loader_class = CachedInstanceLoader
+
+    def before_import(self, dataset, **kwargs):
+        for column, model in (('collection', Collection), ('customer', Customer)):
+            if column not in dataset.headers:
+                continue
+            ids = {int(value) for value in dataset[column] if value not in (None, '')}
+            missing = ids - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            if missing:
+                raise ValueError(f'Unknown {column} ids: {", ".join(map(str, sorted(missing)))}')
+
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        # bulk_create() skips Product.save() and its signals, so slugs and search documents are set here
+        new = [product for product in self.create_instances if not product.slug]
+        for product, slug in zip(new, generate_unique_slugs(Product, [product.title for product in new])):
+            product.slug = slug
+        products = list(self.create_instances)
+        super().bulk_create(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        refresh_search_vectors(Product.objects.filter(pk__in=[product.pk for product in products if product.pk]))
+
+    def bulk_update(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        products = list(self.update_instances)
+        super().bulk_update(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        refresh_search_vectors(Product.objects.filter(pk__in=[product.pk for product in products]))
 
 
 class AuctionResource(resources.ModelResource):
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+from src.tags.models import TaggedItem
+
+from .models import Collection
+
+# Product.search_vector holds the weighted full-text document of a product: its title first, then
+# its collection title and tag labels, then its description. Related rows cannot be joined in an
+# UPDATE, so they are folded in with correlated subqueries. Documents are only maintained, and the
+# GIN index only created, on PostgreSQL; elsewhere searches fall back to SearchFilter.
+
+
+def search_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def product_search_document():
+    collection_title = Collection.objects.filter(pk=OuterRef('collection_id')).values('title')
+    tag_labels = (
+        TaggedItem.objects.filter(content_type__app_label='auction', content_type__model='product', object_id=OuterRef('pk'))
+        .values('object_id')
+        .annotate(labels=StringAgg('tag__label', ' '))
+        .values('labels')
+    )
+
+    config = settings.SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(Subquery(collection_title), weight='B', config=config)
+        + SearchVector(Subquery(tag_labels), weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the search document of the given products with a single UPDATE."""
+    if not search_enabled():
+        return 0
+    return queryset.update(search_vector=product_search_document())
@@ -1,8 +1,9 @@
-from django.db import transaction
 from django.db.models import Q
 from rest_framework import serializers
 
+from .bidding import BidRejected, place_bid
 from .models import *
+from .proxy import resolve_proxies
 
 
 class CollectionSerializer(serializers.ModelSerializer):
@@ -89,11 +90,11 @@ class CustomerSerializer(serializers.ModelSerializer):
             'membership',
             'user_balance',
         ]
+        select_related = ['user', 'balance']
 
     def get_user_balance(self, obj):
         try:
-            user_coin = UserCoin.objects.get(customer=obj)
-            return user_coin.balance
+            return obj.balance.balance
         except UserCoin.DoesNotExist:
             return None
 
@@ -102,12 +103,14 @@ class SimpleCustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['id', 'first_name', 'last_name']
+        select_related = ['user']
 
 
 class BidsCustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['id', 'first_name']
+        select_related = ['user']
 
 
 class SimpleProductSerializer(serializers.ModelSerializer):
@@ -141,6 +144,8 @@ class AuctionSerializer(serializers.ModelSerializer):
             'bids_count',
             'starting_time',
             'ending_time',
+            'soft_close_window',
+            'soft_close_extension',
             'auction_status',
         ]
 
@@ -150,7 +155,16 @@ class CreateAuctionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Auction
-        fields = ['product_id', 'starting_price', 'current_price', 'starting_time', 'ending_time', 'auction_status']
+        fields = [
+            'product_id',
+            'starting_price',
+            'current_price',
+            'starting_time',
+            'ending_time',
+            'soft_close_window',
+            'soft_close_extension',
+            'auction_status',
+        ]
 
     def validate_product_id(self, value):
         if Auction.objects.filter(product_id=value).exists():
@@ -228,35 +242,13 @@ class AddWishlistItemSerializer(serializers.ModelSerializer):
         if WishlistItem.objects.filter(Q(wishlist_id=wishlist_id) & Q(auction_id=auction_id)).exists():
             raise serializers.ValidationError('This auction is already in the wishlist')
 
-        wishlist_item = WishlistItem.objects.create(wishlist_id=wishlist_id, **self.validated_data)
-        return wishlist_item
+        self.instance = WishlistItem.objects.create(wishlist_id=wishlist_id, **self.validated_data)
+        return self.instance
 
     class Meta:
         model = WishlistItem
         fields = ['auction_id', 'auction']  # Include auction_id in the fields
 
-    def to_representation(self, instance):
-        # Call the superclass's to_representation method to get the initial representation
-        representation = super().to_representation(instance)
-
-        # Use validated_data to access the auction_id safely
-        auction_id = self.validated_data.get('auction_id')
-
-        # Now that you have the auction_id, you can fetch the Auction instance
-        if auction_id:
-            auction = Auction.objects.get(pk=auction_id)
-            # Serialize the Auction instance using the WishlistAuctionSerializer
-            auction_serialized = WishlistAuctionSerializer(auction).data
-
-            # Update the representation with the serialized Auction data
-            representation['auction'] = auction_serialized
-        else:
-            # Handle the case where auction_id is not available
-            # This could involve setting a default value or handling the absence of auction_id differently
-            pass
-
-        return representation
-
 
 class AuctionChatSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
@@ -313,78 +305,57 @@ class BidsSerializer(serializers.ModelSerializer):
         model = Bid
         fields = ['id', 'auction_id', 'bidder', 'amount', 'status', 'created_at', 'updated_at']
 
-    def validate_amount(self, value):
-        auction_id = self.context.get('auction_id')
-        current_price = Auction.objects.get(id=auction_id).current_price
-        bidder_id = self.context.get('bidder_id')
-        balance = UserCoin.objects.get(customer=bidder_id).balance
+    def create(self, validated_data):
+        # The id comes from the URL; bid events carry it as a number
+        auction_id = int(self.context.get('auction_id'))
+        return self.place(auction_id, self.context.get('bidder_id'), validated_data['amount'], 'Bids on')
+
+    def update(self, instance, validated_data):
+        return self.place(instance.auction_id, instance.bidder_id, validated_data['amount'], 'Update Bids amount on')
 
-        if value <= current_price:
-            raise serializers.ValidationError('Bid Amount Must be grater than the current bid amount')
+    def place(self, auction_id, bidder_id, amount, action):
+        try:
+            bid = place_bid(auction_id, bidder_id, amount, invoice=f"{action} {self.context.get('auction_title')}")
+        except BidRejected as e:
+            raise serializers.ValidationError({'amount': [str(e)]})
+        resolve_proxies(auction_id, invoice=f"Proxy bid on {self.context.get('auction_title')}")
+        return bid
 
-        user_bid_exist = Bid.objects.filter(Q(auction_id=auction_id) & Q(bidder_id=bidder_id))
-        if user_bid_exist.exists():
-            existing_bid_amount = user_bid_exist.first().amount
-            if balance < (value - existing_bid_amount):
-                raise serializers.ValidationError("You don't have enough balance to bid")
 
-        else:
-            if balance < value:
-                raise serializers.ValidationError("You don't have enough balance to bid")
+class ProxyBidSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProxyBid
+        fields = ['id', 'auction_id', 'max_amount', 'active', 'created_at', 'updated_at']
+        read_only_fields = ['active']
 
+    def validate_max_amount(self, value):
+        auction = Auction.objects.filter(pk=self.context.get('auction_id')).values('current_price').first()
+        if auction is None:
+            raise serializers.ValidationError('No Auction with this ID was found.')
+        if value <= auction['current_price']:
+            raise serializers.ValidationError('Maximum amount must be greater than the current bid amount')
         return value
 
     def create(self, validated_data):
-        auction_id = self.context.get('auction_id')
-        auction_title = self.context.get('auction_title')
-        bidder_id = self.context.get('bidder_id')
-        bidder = Customer.objects.get(pk=bidder_id)
-
-        with transaction.atomic():
-            auction = Auction.objects.get(pk=auction_id)
-            auction.current_price = validated_data['amount']
-            auction.save()
-
-            customr_balance = UserCoin.objects.get(customer=bidder_id)
-            customr_balance.balance = customr_balance.balance - validated_data['amount']
-            customr_balance.save()
-
-            # Save Transaction
-            Transaction.objects.create(
-                invoice=f'Bids on {auction_title}',
-                user=bidder,
-                transaction_type=Transaction.TRANSACTION_TYPE_BID,
-                transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
-                amount=validated_data['amount'],
-            )
-
-            return Bid.objects.create(bidder_id=bidder_id, auction_id=auction_id, **validated_data)
+        # One proxy per bidder and auction: registering again raises (or lowers) the maximum
+        proxy, _ = ProxyBid.objects.update_or_create(
+            auction_id=self.context.get('auction_id'),
+            bidder_id=self.context.get('bidder_id'),
+            defaults={'max_amount': validated_data['max_amount'], 'active': True},
+        )
+        self.resolve(proxy)
+        return proxy
 
     def update(self, instance, validated_data):
-
-        with transaction.atomic():
-            auction = Auction.objects.get(pk=instance.auction_id)
-            auction_title = self.context.get('auction_title')
-            bidder = Customer.objects.get(pk=instance.bidder_id)
-
-            difference = validated_data['amount'] - instance.amount
-            auction.current_price += difference
-            auction.save()
-
-            bidder_balance = UserCoin.objects.get(customer=instance.bidder_id)
-            bidder_balance.balance += instance.amount - validated_data['amount']
-            bidder_balance.save()
-
-            # Save Transaction
-            Transaction.objects.create(
-                invoice=f'Update Bids amount on {auction_title}',
-                user=bidder,
-                transaction_type=Transaction.TRANSACTION_TYPE_BID,
-                transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
-                amount=validated_data['amount'] - instance.amount,
-            )
-
-            return super().update(instance, validated_data)
+        instance.max_amount = validated_data['max_amount']
+        instance.active = True
+        instance.save(update_fields=['max_amount', 'active', 'updated_at'])
+        self.resolve(instance)
+        return instance
+
+    def resolve(self, proxy):
+        resolve_proxies(proxy.auction_id, invoice=f"Proxy bid on {self.context.get('auction_title')}")
+        proxy.refresh_from_db()
 
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -0,0 +1,174 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .bidding import forget_auction_windows
+from .cache import invalidate_auctions
+from .events import EVENT_CLOSED, publish_auction_event
+from .ledger import capture, deposit, release
+from .models import Auction, Bid, CoinHold, Delivery, LedgerEntry, Transaction, UserCoin
+from .orderbook import get_order_book
+
+
+def settle_auctions(auction_ids):
+    """
+    Close a batch of active auctions with a fixed number of queries, however many bids they hold.
+
+    The highest bid of each auction (earliest wins a tie) is found with a window function over
+    the whole batch. The winner gets a pending delivery and the seller is credited with the
+    winning amount. Coins move according to the holds of the batch: the winners' holds are
+    captured and every other hold is released and refunded, so what a bidder gets back is exactly
+    what the bid path locked. One UPDATE marks the holds captured or released, and credits are
+    summed per customer and applied with one bulk update, next to the matching ledger entries.
+    Auctions without bids are simply completed. Returns the number of auctions settled.
+    """
+    with transaction.atomic():
+        auctions = {
+            auction['id']: auction
+            for auction in Auction.objects.filter(pk__in=auction_ids, auction_status=Auction.AUCTION_ACTIVE).values(
+                'id', 'product__title', 'product__customer_id'
+            )
+        }
+        if not auctions:
+            return 0
+
+        winning_bids = (
+            Bid.objects.filter(auction_id__in=auctions, status=True)
+            .annotate(
+                rank=Window(RowNumber(), partition_by=F('auction_id'), order_by=[F('amount').desc(), F('created_at').asc()])
+            )
+            .filter(rank=1)
+            .values_list('id', 'auction_id', 'bidder_id', 'amount')
+        )
+
+        credits = defaultdict(Decimal)
+        winning_bid_ids = []
+        winners = {}
+        deliveries = []
+        transactions = []
+        entries = []
+        for bid_id, auction_id, bidder_id, amount in winning_bids.iterator(chunk_size=2000):
+            title = auctions[auction_id]['product__title']
+            seller_id = auctions[auction_id]['product__customer_id']
+            winning_bid_ids.append(bid_id)
+            winners[auction_id] = {'winner_id': bidder_id, 'amount': str(amount)}
+            credits[seller_id] += amount
+            entries.append(deposit(seller_id, amount, auction_id))
+            deliveries.append(Delivery(auction_id=auction_id, customer_id=bidder_id, status=Delivery.DELIVERY_STATUS_PENDING))
+            transactions.append(
+                Transaction(
+                    invoice=f'Received {amount} for the auction {title}',
+                    user_id=seller_id,
+                    amount=amount,
+                    transaction_type=Transaction.TRANSACTION_TYPE_DEPOSITE,
+                    transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
+                )
+            )
+
+        holds = (
+            CoinHold.objects.filter(auction_id__in=auctions, status=CoinHold.HOLD_STATUS_HELD)
+            .annotate(
+                bid_id=Subquery(
+                    Bid.objects.filter(auction_id=OuterRef('auction_id'), bidder_id=OuterRef('customer_id')).values('id')
+                )
+            )
+            .values_list('auction_id', 'customer_id', 'amount', 'bid_id')
+        )
+        for auction_id, customer_id, amount, bid_id in holds.iterator(chunk_size=2000):
+            if customer_id == winners.get(auction_id, {}).get('winner_id'):
+                entries.append(capture(customer_id, amount, auction_id, bid_id))
+                continue
+
+            credits[customer_id] += amount
+            entries.append(release(customer_id, amount, auction_id, bid_id))
+            transactions.append(
+                Transaction(
+                    invoice=f"Refunded for the auction {auctions[auction_id]['product__title']}",
+                    user_id=customer_id,
+                    amount=amount,
+                    transaction_type=Transaction.TRANSACTION_TYPE_REFUND,
+                    transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
+                )
+            )
+
+        now = timezone.now()
+        Auction.objects.filter(pk__in=auctions).update(auction_status=Auction.AUCTION_COMPLETED, updated_at=now)
+        Bid.objects.filter(auction_id__in=auctions, status=True).exclude(pk__in=winning_bid_ids).update(
+            status=False, updated_at=now
+        )
+        captured = Q(pk__in=[])
+        for auction_id, winner in winners.items():
+            captured |= Q(auction_id=auction_id, customer_id=winner['winner_id'])
+        CoinHold.objects.filter(auction_id__in=auctions, status=CoinHold.HOLD_STATUS_HELD).update(
+            status=Case(
+                When(captured, then=Value(CoinHold.HOLD_STATUS_CAPTURED)),
+                default=Value(CoinHold.HOLD_STATUS_RELEASED),
+            ),
+            updated_at=now,
+        )
+        # Balance rows are locked in customer order so concurrent settlements cannot deadlock: the
+        # UPDATE below would lock them in whatever order it scans them
+        list(UserCoin.objects.select_for_update().filter(pk__in=credits).order_by('pk').values_list('pk', flat=True))
+        UserCoin.objects.bulk_update(
+            [
+                UserCoin(customer_id=customer_id, balance=F('balance') + amount, updated_at=now)
+                for customer_id, amount in sorted(credits.items())
+            ],
+            ['balance', 'updated_at'],
+            batch_size=1000,
+        )
+        Delivery.objects.bulk_create(deliveries, batch_size=1000)
+        Transaction.objects.bulk_create(transactions, batch_size=1000)
+        LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+        for auction_id in auctions:
+            publish_auction_event(auction_id, EVENT_CLOSED, **winners.get(auction_id, {'winner_id': None, 'amount': None}))
+        # Callers such as close_overdue_auctions commit later: dropped before that, the payloads
+        # and bid windows would be cached again, still active, by a concurrent reader
+        transaction.on_commit(lambda: forget_settled_auctions(list(auctions)))
+
+    return len(auctions)
+
+
+def forget_settled_auctions(auction_ids):
+    forget_auction_windows(auction_ids)
+    invalidate_auctions(auction_ids)
+    if settings.AUCTION_ORDER_BOOK_ENABLED:
+        book = get_order_book()
+        for auction_id in auction_ids:
+            book.clear(auction_id)
+
+
+def close_overdue_auctions(limit, auction_ids=None):
+    """
+    Claim up to ``limit`` active auctions whose ending time has passed and settle them.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and stay locked until the
+    settlement commits, so concurrent workers settle disjoint sets and never wait on each other.
+    A retried task finds the auctions already completed and settles nothing twice.
+
+    place_bid locks the bidder's Bid row before the auction row, the opposite order. Settling an
+    auction rewrites its bids, so waiting for a bid row that a late bid holds while holding that
+    bid's auction would deadlock. The bids of the claimed auctions are therefore locked with SKIP
+    LOCKED as well: an auction with a bid in flight is left active for the next sweep, and the
+    bid goes through once this batch commits.
+    """
+    overdue = Auction.objects.filter(auction_status=Auction.AUCTION_ACTIVE, ending_time__lte=timezone.now())
+    if auction_ids is not None:
+        overdue = overdue.filter(pk__in=auction_ids)
+
+    with transaction.atomic():
+        claimed = list(overdue.select_for_update(skip_locked=True).order_by('ending_time').values_list('id', flat=True)[:limit])
+        if not claimed:
+            return 0
+
+        bids = Bid.objects.filter(auction_id__in=claimed)
+        locked = Counter(bids.select_for_update(skip_locked=True).order_by('pk').values_list('auction_id', flat=True))
+        counts = dict(bids.order_by().values('auction_id').annotate(count=Count('pk')).values_list('auction_id', 'count'))
+        idle = [auction_id for auction_id in claimed if locked[auction_id] == counts.get(auction_id, 0)]
+        return settle_auctions(idle) if idle else 0
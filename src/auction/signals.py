@@ -1,8 +1,20 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import Customer, UserCoin
+from src.tags.models import Tag, TaggedItem
+
+from .bidding import forget_auction_windows
+from .cache import auction_slug_key, invalidate_auctions
+from .ledger import open_account
+from .models import Auction, Collection, Customer, Product, ProductImage, UserCoin
+from .search import refresh_search_vectors
+from .tasks import schedule_closing
+
+# Auctions that still have to be closed at their ending time
+CLOSING_STATUSES = (Auction.AUCTION_ACTIVE, Auction.AUCTION_SCHEDULE)
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -14,4 +26,76 @@ def create_customer_for_new_user(sender, **kwargs):
 @receiver(post_save, sender=Customer)
 def create_balance_for_new_customer(sender, **kwargs):
     if kwargs['created']:
-        UserCoin.objects.create(customer=kwargs['instance'])
+        coin = UserCoin.objects.create(customer=kwargs['instance'])
+        open_account(coin.customer_id, coin.balance)
+
+
+@receiver(pre_save, sender=Auction)
+def detect_closing_change(sender, instance, update_fields=None, **kwargs):
+    # Only a new auction, a new ending time or a reopened auction needs a close_auction task: saves
+    # that leave them alone would queue one more task for the same ending time
+    instance._closing_changed = False
+    if not settings.AUCTION_CLOSE_AT_ENDING_TIME or instance.auction_status not in CLOSING_STATUSES:
+        return
+    if update_fields is not None and not {'auction_status', 'ending_time'} & set(update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values('auction_status', 'ending_time').first() if instance.pk else None
+    instance._closing_changed = (
+        previous is None or previous['ending_time'] != instance.ending_time or previous['auction_status'] not in CLOSING_STATUSES
+    )
+
+
+@receiver(post_save, sender=Auction)
+def schedule_auction_closing(sender, instance, **kwargs):
+    if getattr(instance, '_closing_changed', False):
+        transaction.on_commit(lambda: schedule_closing(instance.id, instance.ending_time))
+
+
+@receiver(post_save, sender=Auction)
+@receiver(post_delete, sender=Auction)
+def invalidate_auction_cache(sender, instance, **kwargs):
+    # Caches are dropped once the change is committed, so that a concurrent reader cannot cache the
+    # rows as they were before it; ids are read now, as a deleted instance loses its own
+    auction_id = instance.id
+    slug = Product.objects.filter(pk=instance.product_id).values_list('slug', flat=True).first()
+
+    def invalidate():
+        forget_auction_windows([auction_id])
+        invalidate_auctions([auction_id])
+        if slug:
+            cache.delete(auction_slug_key(slug))
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductImage)
+def invalidate_product_auctions_cache(sender, instance, **kwargs):
+    product_id = instance.id if sender is Product else instance.product_id
+    transaction.on_commit(lambda: invalidate_auctions(Auction.objects.filter(product_id=product_id).values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, **kwargs):
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Collection)
+def refresh_collection_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(Product.objects.filter(collection_id=instance.pk))
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def refresh_tagged_product_search_vector(sender, instance, **kwargs):
+    if instance.content_type.model_class() is Product:
+        refresh_search_vectors(Product.objects.filter(pk=instance.object_id))
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        tagged = TaggedItem.objects.filter(tag=instance, content_type__app_label='auction', content_type__model='product')
+        refresh_search_vectors(Product.objects.filter(pk__in=tagged.values('object_id')))
@@ -0,0 +1,117 @@
+import hashlib
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db.models import Q
+
+from src.tags.models import Tag
+
+from .models import Collection, Product
+from .search import search_enabled
+
+# Typeahead over product titles, collection titles and tag labels. On PostgreSQL the candidates come
+# from pg_trgm GIN indexes (substring and fuzzy matches, best similarity first); elsewhere from a
+# per-process prefix trie rebuilt every AUCTION_SUGGEST_TRIE_REFRESH seconds. Either way, answers
+# are cached per normalized prefix, so the common short prefixes barely reach the database.
+
+SOURCES = [
+    ('product', Product, 'title'),
+    ('collection', Collection, 'title'),
+    ('tag', Tag, 'label'),
+]
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def trigram_suggestions(term, limit):
+    suggestions = []
+    for kind, model, field in SOURCES:
+        rows = (
+            # ~* rather than icontains, whose UPPER() wrapping the trigram index cannot serve
+            model.objects.filter(Q(**{f'{field}__iregex': re.escape(term)}) | Q(**{f'{field}__trigram_similar': term}))
+            .annotate(score=TrigramSimilarity(field, term))
+            .order_by('-score')
+            .values_list(field, 'score')
+            .distinct()[:limit]
+        )
+        suggestions += [(score, {'type': kind, 'text': text}) for text, score in rows]
+    suggestions.sort(key=lambda suggestion: -suggestion[0])
+    return [suggestion for score, suggestion in suggestions[:limit]]
+
+
+class PrefixTrie:
+    """
+    Trie over every word start of the indexed texts ("red leather bag" is reachable from "leather"
+    and "bag" too). Each node keeps the first ``limit`` entries below it, so a lookup costs the
+    length of the prefix whatever the catalogue size. Insert shorter texts first to favour them.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.root = {}
+
+    def insert(self, text, entry):
+        words = normalize(text).split(' ')
+        for start in range(len(words)):
+            node = self.root
+            for char in ' '.join(words[start:]):
+                node = node.setdefault(char, {})
+                entries = node.setdefault(None, [])
+                if len(entries) < self.limit and entry not in entries:
+                    entries.append(entry)
+
+    def search(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return list(node.get(None, []))
+
+
+_trie = None
+_trie_built_at = 0
+_trie_lock = threading.Lock()
+
+
+def build_trie(limit):
+    entries = []
+    for kind, model, field in SOURCES:
+        texts = model.objects.values_list(field, flat=True).distinct().iterator()
+        entries += [(text, {'type': kind, 'text': text}) for text in texts]
+    entries.sort(key=lambda item: len(item[0]))
+
+    trie = PrefixTrie(limit)
+    for text, entry in entries:
+        trie.insert(text, entry)
+    return trie
+
+
+def get_trie():
+    global _trie, _trie_built_at
+    if _trie is None or time.monotonic() - _trie_built_at > settings.AUCTION_SUGGEST_TRIE_REFRESH:
+        with _trie_lock:
+            if _trie is None or time.monotonic() - _trie_built_at > settings.AUCTION_SUGGEST_TRIE_REFRESH:
+                _trie = build_trie(settings.AUCTION_SUGGEST_MAX_LIMIT)
+                _trie_built_at = time.monotonic()
+    return _trie
+
+
+def suggest(term, limit):
+    term = normalize(term)
+    backend = 'trigram' if search_enabled() else 'trie'
+    key = f'suggest:{backend}:{limit}:{hashlib.md5(term.encode()).hexdigest()}'
+    suggestions = cache.get(key)
+    if suggestions is None:
+        if backend == 'trigram':
+            suggestions = trigram_suggestions(term, limit)
+        else:
+            suggestions = get_trie().search(term)[:limit]
+        cache.set(key, suggestions, settings.AUCTION_SUGGEST_CACHE_TIMEOUT)
+    return suggestions
@@ -1,62 +1,134 @@
+import math
 from datetime import timedelta
 
 from celery import shared_task
-from django.db import transaction
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
-from .models import Auction, Bid, Delivery, Transaction, UserCoin
+from .bidding import forget_auction_windows
+from .bidqueue import drain_partition, get_bid_queue, partition_queue
+from .cache import invalidate_auctions
+from .models import Auction
+from .orderbook import flush_pending_bids
+from .settlement import close_overdue_auctions
+
+
+@shared_task
+def flush_order_book():
+    if settings.AUCTION_ORDER_BOOK_ENABLED:
+        while flush_pending_bids(settings.AUCTION_ORDER_BOOK_FLUSH_BATCH_SIZE):
+            pass
 
 
 @shared_task
 def process_completed_auctions():
-    now = timezone.localtime().replace(second=0, microsecond=0)
-    print(f'[DATE :::: TIME] {now}')
+    """Fan overdue auctions out to several workers; each one claims its own batches."""
+    # Commit bids still waiting in the order book before deciding the winners
+    flush_order_book()
+
+    overdue = Auction.objects.filter(auction_status=Auction.AUCTION_ACTIVE, ending_time__lte=timezone.now()).count()
+    batches = math.ceil(overdue / settings.AUCTION_SETTLEMENT_BATCH_SIZE)
+    for _ in range(min(batches, settings.AUCTION_CLOSING_WORKERS)):
+        close_overdue_auctions_task.delay()
+
+
+@shared_task
+def close_overdue_auctions_task():
+    while close_overdue_auctions(settings.AUCTION_SETTLEMENT_BATCH_SIZE):
+        pass
+
+
+def closing_scheduled_key(auction_id, ending_time):
+    return f'auction:{auction_id}:closing:{ending_time.timestamp()}'
+
+
+def schedule_closing(auction_id, ending_time):
+    """
+    Queue close_auction at ``ending_time`` if it is at most AUCTION_CLOSE_ETA_HORIZON away.
+
+    Redis hands an ETA task that is still waiting to another worker once the broker's
+    visibility_timeout has passed, so a task further out would run once per timeout. Auctions
+    ending later get their task from schedule_closing_auctions once they enter the horizon. A key
+    per auction and ending time, kept until that time, makes sure each one is queued only once.
+    """
+    remaining = ending_time - timezone.now()
+    if remaining > timedelta(seconds=settings.AUCTION_CLOSE_ETA_HORIZON):
+        return
+    if cache.add(closing_scheduled_key(auction_id, ending_time), True, max(int(remaining.total_seconds()), 1)):
+        close_auction.apply_async(args=[auction_id], eta=ending_time)
+
+
+@shared_task
+def schedule_closing_auctions():
+    """Beat tick: queue close_auction for the auctions whose ending time is now within the ETA horizon."""
+    if not settings.AUCTION_CLOSE_AT_ENDING_TIME:
+        return
+    now = timezone.now()
+    ending = Auction.objects.filter(
+        auction_status__in=(Auction.AUCTION_ACTIVE, Auction.AUCTION_SCHEDULE),
+        ending_time__gt=now,
+        ending_time__lte=now + timedelta(seconds=settings.AUCTION_CLOSE_ETA_HORIZON),
+    )
+    for auction_id, ending_time in ending.values_list('id', 'ending_time').iterator():
+        schedule_closing(auction_id, ending_time)
+
 
-    # Use a small time range to account for any slight differences in ending_time
-    time_range_start = now - timedelta(minutes=1)
-    time_range_end = now + timedelta(minutes=1)
+@shared_task
+def close_auction(auction_id):
+    """Close one auction at its ending time, scheduled by schedule_closing."""
+    flush_order_book()
 
-    completed_auctions = Auction.objects.filter(
-        ending_time__range=(time_range_start, time_range_end), auction_status=Auction.AUCTION_ACTIVE
+    ending_time = (
+        Auction.objects.filter(pk=auction_id, auction_status=Auction.AUCTION_ACTIVE).values_list('ending_time', flat=True).first()
     )
-    print(f'Completed auctions: {completed_auctions}')
-
-    for auction in completed_auctions:
-        with transaction.atomic():
-            highest_bid = Bid.objects.filter(auction=auction, status=True).order_by('-amount').first()
-
-            if highest_bid:
-                auction.auction_status = Auction.AUCTION_COMPLETED
-                auction.save()
-
-                Delivery.objects.create(auction=auction, customer=highest_bid.bidder, status=Delivery.DELIVERY_STATUS_PENDING)
-
-                other_bids = Bid.objects.filter(auction=auction, status=True).exclude(id=highest_bid.id)
-
-                for bid in other_bids:
-                    user_coin, created = UserCoin.objects.get_or_create(customer=bid.bidder)
-                    user_coin.balance += bid.amount
-                    user_coin.save()
-                    bid.status = False
-                    bid.save()
-
-                    Transaction.objects.create(
-                        invoice=f'Refunded for the auction {auction.product.title}',  # noqa: E251
-                        user=bid.bidder,
-                        amount=bid.amount,
-                        transaction_type=Transaction.TRANSACTION_TYPE_REFUND,
-                        transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
-                    )
-
-                seller = auction.product.customer
-                seller_coin, created = UserCoin.objects.get_or_create(customer=seller.id)
-                seller_coin.balance += highest_bid.amount
-                seller_coin.save()
-
-                Transaction.objects.create(
-                    invoice=f'Received {highest_bid.amount} for the auction {auction.product.title}',  # noqa: E251
-                    user=seller,
-                    amount=highest_bid.amount,
-                    transaction_type=Transaction.TRANSACTION_TYPE_DEPOSITE,
-                    transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
-                )
+    if ending_time is None:
+        return
+    if ending_time > timezone.now():
+        # The ending time was moved since this task was scheduled
+        schedule_closing(auction_id, ending_time)
+        return
+
+    close_overdue_auctions(1, auction_ids=[auction_id])
+
+
+@shared_task
+def activate_scheduled_auctions():
+    """
+    Timer-wheel tick: flip scheduled auctions whose starting time has come to active.
+
+    Due auctions are found through the (auction_status, starting_time) index and switched with
+    one UPDATE per batch.
+    """
+    batch_size = settings.AUCTION_ACTIVATION_BATCH_SIZE
+    while True:
+        due = list(
+            Auction.objects.filter(auction_status=Auction.AUCTION_SCHEDULE, starting_time__lte=timezone.now())
+            .order_by('starting_time')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not due:
+            break
+
+        Auction.objects.filter(pk__in=due, auction_status=Auction.AUCTION_SCHEDULE).update(
+            auction_status=Auction.AUCTION_ACTIVE, updated_at=timezone.now()
+        )
+        forget_auction_windows(due)
+        invalidate_auctions(due)
+
+
+@shared_task
+def drain_bid_partition(partition):
+    """Apply the queued bids of one partition; runs on Celery queue bids-<partition>."""
+    drain_partition(partition)
+
+
+@shared_task
+def drain_bid_queues():
+    """Safety net for drains that were never scheduled: wake up the consumer of every non-empty partition."""
+    if not settings.AUCTION_BID_QUEUE_ENABLED:
+        return
+    queue = get_bid_queue()
+    for partition in range(settings.AUCTION_BID_QUEUE_PARTITIONS):
+        if queue.depth(partition):
+            drain_bid_partition.apply_async(args=[partition], queue=partition_queue(partition))
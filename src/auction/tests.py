@@ -0,0 +1,1108 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework.throttling import SimpleRateThrottle
+
+from src.core.serializers import TokenObtainPairSerializer
+from src.tags.models import Tag
+from src.utils import slugs
+
+from .bidding import BidRejected, InsufficientBalance, auction_window_key, get_auction_window, place_bid
+from .bidqueue import TICKET_ACCEPTED, TICKET_QUEUED, apply_queued_bids, get_bid_queue, get_partition, store_outcomes
+from .cache import auction_version_key, get_version
+from .events import EVENT_BID, publish_auction_event
+from .explain import explain_hot_queries, sequential_scans
+from .exports import EXPORTS
+from .ledger import adjust_balance, ledger_balances, materialize_balances, unsettled_escrow
+from .models import Auction, Bid, CoinHold, Collection, Product, ProxyBid, Question, Transaction, UserCoin, Wishlist, WishlistItem
+from .orderbook import flush_pending_bids, get_order_book
+from .proxy import resolve_proxies
+from .routing import websocket_urlpatterns
+from .settlement import close_overdue_auctions
+from .tasks import schedule_closing_auctions
+
+# Tests run against process-local stand-ins of Redis and the channel layer, and auctions are only
+# closed when a test settles them itself
+TEST_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'AUCTION_CLOSE_AT_ENDING_TIME': False,
+    'AUCTION_ORDER_BOOK_ENABLED': False,
+    'AUCTION_ORDER_BOOK_BACKEND': 'src.auction.orderbook.InMemoryOrderBook',
+    'AUCTION_BID_QUEUE_ENABLED': False,
+    'AUCTION_BID_QUEUE_BACKEND': 'src.auction.bidqueue.InMemoryBidQueue',
+    # Tests create many users
+    'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+}
+
+
+def create_customer(username, **kwargs):
+    user = get_user_model().objects.create_user(
+        username=username, email=f'{username}@example.com', password='secret', first_name=username, **kwargs
+    )
+    return user.customer
+
+
+def create_auction(seller, title='Vintage camera', price=100, **kwargs):
+    collection, _ = Collection.objects.get_or_create(title='Cameras', slug='cameras')
+    product = Product.objects.create(title=title, customer=seller, collection=collection, price=price)
+    now = timezone.now()
+    kwargs.setdefault('starting_time', now - timedelta(hours=1))
+    kwargs.setdefault('ending_time', now + timedelta(hours=1))
+    return Auction.objects.create(product=product, starting_price=price, current_price=price, **kwargs)
+
+
+class AuctionTestMixin:
+    def setUp(self):
+        # Throttle buckets and cached payloads live in the cache, the books and queues in the process
+        cache.clear()
+        get_order_book.cache_clear()
+        get_bid_queue.cache_clear()
+
+    def authenticate(self, customer):
+        token = TokenObtainPairSerializer.get_token(customer.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+
+@override_settings(**TEST_SETTINGS)
+class AuctionTestCase(AuctionTestMixin, APITestCase):
+    pass
+
+
+@override_settings(**TEST_SETTINGS)
+class ConcurrentAuctionTestCase(AuctionTestMixin, APITransactionTestCase):
+    """Commits for real, so that work spread over threads (each with its own connection) contends on the database."""
+
+    def run_concurrently(self, function, calls, workers=16):
+        """Call ``function(*args)`` for each ``args`` of ``calls``; returns the results, or the exceptions raised."""
+
+        def run(args):
+            try:
+                return function(*args)
+            except Exception as e:
+                return e
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run, calls))
+
+
+class QueryCountTests(AuctionTestCase):
+    """List endpoints must run the same queries whether they render two rows or twenty."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = create_customer('seller')
+        self.authenticate(self.seller)
+
+    def assertConstantQueries(self, url, grow):
+        grow(2)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        grow(20)
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_products(self):
+        collection = Collection.objects.create(title='Lenses')
+
+        def grow(size):
+            while Product.objects.filter(customer=self.seller).count() < size:
+                Product.objects.create(title='Lens', customer=self.seller, collection=collection, price=10)
+
+        response = self.assertConstantQueries(f'/api/customers/{self.seller.id}/products/?page_size=100', grow)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_customers(self):
+        def grow(size):
+            while get_user_model().objects.count() < size:
+                create_customer(f'customer{get_user_model().objects.count()}')
+
+        response = self.assertConstantQueries('/api/customers/', grow)
+        self.assertEqual(response.data['results'][0]['id'], self.seller.id)
+
+    def test_wishlist_items(self):
+        wishlist = Wishlist.objects.create()
+
+        def grow(size):
+            while wishlist.items.count() < size:
+                WishlistItem.objects.create(wishlist=wishlist, auction=create_auction(self.seller))
+
+        response = self.assertConstantQueries(f'/api/wishlists/{wishlist.id}/items/?page_size=100', grow)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_auctions(self):
+        def grow(size):
+            while Auction.objects.count() < size:
+                create_auction(self.seller)
+
+        response = self.assertConstantQueries('/api/auctions/?page_size=100', grow)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_async_auctions(self):
+        def grow(size):
+            while Auction.objects.count() < size:
+                create_auction(self.seller)
+
+        response = self.assertConstantQueries('/api/async/auctions/?page_size=100', grow)
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_bids(self):
+        auction = create_auction(self.seller)
+
+        def grow(size):
+            while auction.bids.count() < size:
+                bidder = create_customer(f'bidder{auction.bids.count()}')
+                Bid.objects.create(auction=auction, bidder=bidder, amount=Decimal(200 + auction.bids.count()))
+
+        response = self.assertConstantQueries(f'/api/auctions/{auction.id}/bids/?page_size=100', grow)
+        self.assertEqual(len(response.data['results']), 20)
+        response = self.assertConstantQueries(f'/api/async/auctions/{auction.id}/bids/?page_size=100', grow)
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_questions(self):
+        auction = create_auction(self.seller)
+
+        def grow(size):
+            while Question.objects.filter(auction=auction).count() < size:
+                asker = create_customer(f'asker{Question.objects.count()}')
+                question = Question.objects.create(auction=auction, customer=asker, question='Does it work?')
+                question.answers.create(customer=self.seller, answer='It does.')
+
+        response = self.assertConstantQueries(f'/api/auctions/{auction.id}/questions/?page_size=100', grow)
+        self.assertEqual(len(response.data['results']), 20)
+
+
+@override_settings(AUCTION_ORDER_BOOK_ENABLED=True)
+class OrderBookTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        seller = create_customer('seller')
+        self.auction = create_auction(seller)
+        self.other_auction = create_auction(seller)
+        self.bidder = create_customer('bidder')
+        self.authenticate(self.bidder)
+
+    def bid(self, auction, amount):
+        return self.client.post(f'/api/auctions/{auction.id}/bids/', {'amount': amount})
+
+    def test_rejects_bid_above_balance(self):
+        response = self.bid(self.auction, 99999)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_order_book().pending_count(), 0)
+        # The rejected bid must not block lower, affordable bids
+        self.assertEqual(self.bid(self.auction, 500).status_code, 202)
+
+    def test_rejects_bids_outside_of_the_auction_window(self):
+        Auction.objects.filter(pk=self.auction.pk).update(ending_time=timezone.now())
+        response = self.bid(self.auction, 500)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'amount': ['This auction is not accepting bids.']})
+        self.assertEqual(
+            self.client.post('/api/auctions/0/bids/', {'amount': 500}).data['amount'], ['No Auction with this ID was found.']
+        )
+        self.assertEqual(get_order_book().pending_count(), 0)
+
+    def test_reserves_pending_bids_across_auctions(self):
+        self.assertEqual(self.bid(self.auction, 6000).status_code, 202)
+        self.assertEqual(self.bid(self.other_auction, 6000).status_code, 400)
+        # Raising one's own bid only reserves the raise
+        self.assertEqual(self.bid(self.auction, 9000).status_code, 202)
+        self.assertEqual(self.bid(self.other_auction, 1000).status_code, 202)
+        self.assertEqual(self.bid(self.other_auction, 1001).status_code, 400)
+
+    def test_flush_releases_reserved_coins(self):
+        self.assertEqual(self.bid(self.auction, 6000).status_code, 202)
+        self.assertEqual(self.bid(self.auction, 9000).status_code, 202)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_pending_bids(10), 2)
+
+        self.assertEqual(UserCoin.objects.get(customer=self.bidder).balance, 1000)
+        self.assertEqual(Bid.objects.get(auction=self.auction, bidder=self.bidder).amount, 9000)
+        self.assertEqual(get_order_book().reserved, {})
+        self.assertEqual(self.bid(self.other_auction, 1000).status_code, 202)
+        self.assertEqual(self.bid(self.other_auction, 1001).status_code, 400)
+
+    @override_settings(AUCTION_ORDER_BOOK_CLAIM_IDLE=0)
+    def test_failed_flush_is_claimed_again(self):
+        self.assertEqual(self.bid(self.auction, 6000).status_code, 202)
+        with mock.patch('src.auction.orderbook.place_bid', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            flush_pending_bids(10)
+        self.assertEqual(get_order_book().pending_count(), 1)
+        self.assertFalse(Bid.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_pending_bids(10), 1)
+        self.assertEqual(Bid.objects.get(auction=self.auction, bidder=self.bidder).amount, 6000)
+        self.assertEqual(get_order_book().pending_count(), 0)
+
+
+@override_settings(AUCTION_BID_QUEUE_ENABLED=True)
+class BidQueueTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = create_auction(create_customer('seller'))
+        self.bidder = create_customer('bidder')
+        self.authenticate(self.bidder)
+
+    def test_failed_batch_is_applied_again(self):
+        response = self.client.post(f'/api/auctions/{self.auction.id}/bids/', {'amount': 500})
+        self.assertEqual(response.status_code, 202)
+        ticket_url = response['Location']
+        partition = get_partition(self.auction.id)
+
+        with mock.patch('src.auction.bidqueue.place_bid', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            apply_queued_bids(partition, 10)
+        self.assertEqual(get_bid_queue().depth(partition), 1)
+        self.assertEqual(self.client.get(ticket_url).data['status'], TICKET_QUEUED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_queued_bids(partition, 10), 1)
+        self.assertEqual(get_bid_queue().depth(partition), 0)
+        self.assertEqual(self.client.get(ticket_url).data['status'], TICKET_ACCEPTED)
+        self.assertEqual(Bid.objects.get(auction=self.auction, bidder=self.bidder).amount, 500)
+
+    def apply_without_acknowledging(self, partition, tickets_stored=True):
+        # The worker dies once the batch is committed, before the entries (and maybe the tickets) are updated
+        with mock.patch.object(get_bid_queue(), 'ack'):
+            with mock.patch('src.auction.bidqueue.store_outcomes', wraps=store_outcomes if tickets_stored else None):
+                with self.captureOnCommitCallbacks(execute=True):
+                    apply_queued_bids(partition, 10)
+
+    def test_replayed_batch_keeps_its_outcome(self):
+        url = f'/api/auctions/{self.auction.id}/bids/'
+        ticket_urls = [self.client.post(url, {'amount': amount})['Location'] for amount in (500, 600)]
+        partition = get_partition(self.auction.id)
+        self.apply_without_acknowledging(partition)
+        self.assertEqual(get_bid_queue().depth(partition), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_queued_bids(partition, 10), 2)
+        self.assertEqual(get_bid_queue().depth(partition), 0)
+        # Placed again, the first bid would be rejected as lower than the second one
+        self.assertEqual([self.client.get(ticket_url).data['status'] for ticket_url in ticket_urls], [TICKET_ACCEPTED] * 2)
+        self.assertEqual(UserCoin.objects.get(customer=self.bidder).balance, 9400)
+
+    def test_replayed_batch_finds_its_committed_bids(self):
+        ticket_url = self.client.post(f'/api/auctions/{self.auction.id}/bids/', {'amount': 500})['Location']
+        partition = get_partition(self.auction.id)
+        self.apply_without_acknowledging(partition, tickets_stored=False)
+        self.assertEqual(get_bid_queue().depth(partition), 1)
+        self.assertEqual(self.client.get(ticket_url).data['status'], TICKET_QUEUED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_queued_bids(partition, 10), 1)
+        self.assertEqual(get_bid_queue().depth(partition), 0)
+        ticket = self.client.get(ticket_url).data
+        self.assertEqual(ticket['status'], TICKET_ACCEPTED)
+        self.assertEqual(ticket['bid_id'], Bid.objects.get(auction=self.auction, bidder=self.bidder).id)
+        self.assertEqual(UserCoin.objects.get(customer=self.bidder).balance, 9500)
+
+    @override_settings(AUCTION_ADMISSION_MAX_BACKLOG=1)
+    def test_sheds_bids_past_the_partition_backlog(self):
+        url = f'/api/auctions/{self.auction.id}/bids/'
+        self.assertEqual(self.client.post(url, {'amount': 500}).status_code, 202)
+        self.assertEqual(self.client.post(url, {'amount': 600}).status_code, 202)
+        response = self.client.post(url, {'amount': 700})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        # Other partitions are drained independently and still admit bids
+        other = create_auction(self.auction.product.customer)
+        while get_partition(other.id) == get_partition(self.auction.id):
+            other = create_auction(self.auction.product.customer)
+        self.assertEqual(self.client.post(f'/api/auctions/{other.id}/bids/', {'amount': 500}).status_code, 202)
+
+
+class AsyncBidTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = create_auction(create_customer('seller'))
+        self.bidder = create_customer('bidder')
+        self.authenticate(self.bidder)
+        self.url = f'/api/async/auctions/{self.auction.id}/bids/'
+
+    def bid(self, amount):
+        return self.client.post(self.url, {'amount': amount}, format='json')
+
+    def test_lists_like_the_sync_view(self):
+        seller = create_customer('lister')
+        for price in (120, 180, 150, 300):
+            create_auction(seller, title=f'Camera {price}', price=price)
+
+        for query in ('?ordering=current_price&current_price__gt=140', '?ordering=-bids_count&page_size=2', '?search=Camera 150'):
+            sync, asynchronous = self.client.get(f'/api/auctions/{query}'), self.client.get(f'/api/async/auctions/{query}')
+            self.assertEqual(asynchronous.status_code, 200, asynchronous.content)
+            self.assertTrue(sync.data['results'])
+            self.assertEqual(
+                [auction['id'] for auction in asynchronous.json()['results']], [auction['id'] for auction in sync.data['results']]
+            )
+            self.assertEqual(asynchronous.json()['next'] is None, sync.data['next'] is None)
+
+        self.assertEqual(self.client.get('/api/async/auctions/?current_price__gt=abc').status_code, 400)
+
+    def test_pages_bids_like_the_sync_view(self):
+        for amount in (200, 250, 300):
+            Bid.objects.create(auction=self.auction, bidder=create_customer(f'bidder{amount}'), amount=amount)
+
+        sync_url = f'/api/auctions/{self.auction.id}/bids/'
+        sync, asynchronous = self.client.get(sync_url, {'page_size': 2}), self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(asynchronous.status_code, 200, asynchronous.content)
+        self.assertEqual(asynchronous.json()['results'], sync.json()['results'])
+        self.assertEqual([bid['amount'] for bid in asynchronous.json()['results']], [300, 250])
+
+        # The cursors are interchangeable
+        cursor = asynchronous.json()['next'].split('cursor=')[1].split('&')[0]
+        self.assertEqual(sync.json()['next'].split('cursor=')[1].split('&')[0], cursor)
+        page = self.client.get(self.url, {'page_size': 2, 'cursor': cursor}).json()
+        self.assertEqual([bid['amount'] for bid in page['results']], [200])
+        self.assertIsNone(page['next'])
+        self.assertIsNotNone(page['previous'])
+
+    @override_settings(AUCTION_ORDER_BOOK_ENABLED=True)
+    def test_submits_to_the_order_book(self):
+        response = self.bid(500)
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(response.json(), {'auction_id': self.auction.id, 'amount': 500})
+        self.assertFalse(Bid.objects.exists())
+        self.assertEqual(self.bid(400).json(), {'amount': ['Bid Amount Must be grater than the current bid amount']})
+
+    @override_settings(AUCTION_BID_QUEUE_ENABLED=True)
+    def test_enqueues_bids(self):
+        response = self.bid(500)
+        self.assertEqual(response.status_code, 202, response.content)
+        ticket = response.json()['ticket']
+        self.assertEqual(response['Location'], f'http://testserver/api/bid-tickets/{ticket}/')
+        self.assertEqual(
+            response.json(), {'ticket': ticket, 'status': TICKET_QUEUED, 'auction_id': self.auction.id, 'amount': 500}
+        )
+        self.assertEqual(get_bid_queue().depth(get_partition(self.auction.id)), 1)
+
+    @mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'bids_user': '2/min'})
+    def test_throttles_bids(self):
+        self.assertEqual(self.bid(500).status_code, 201)
+        self.assertEqual(self.bid(600).status_code, 201)
+        response = self.bid(700)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Bid.objects.get(auction=self.auction).amount, 600)
+
+
+class PlaceBidTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = create_auction(create_customer('seller'))
+        self.bidder = create_customer('bidder')
+
+    def balance(self):
+        return UserCoin.objects.get(customer=self.bidder).balance
+
+    def test_charges_fractional_amounts(self):
+        place_bid(self.auction.id, self.bidder.id, Decimal('100.50'))
+        self.assertEqual(self.balance(), Decimal('9899.50'))
+        place_bid(self.auction.id, self.bidder.id, Decimal('101.25'))
+        self.assertEqual(self.balance(), Decimal('9898.75'))
+
+    def test_concurrent_first_bids_of_one_bidder(self):
+        place_bid(self.auction.id, self.bidder.id, Decimal(150))
+
+        # The lookup misses the bid, as it does when a concurrent first bid commits right after it
+        lookups = iter([Bid.objects.none, Bid.objects.select_for_update])
+        with mock.patch.object(Bid.objects, 'select_for_update', side_effect=lambda: next(lookups)()):
+            bid = place_bid(self.auction.id, self.bidder.id, Decimal(200))
+
+        self.assertEqual(Bid.objects.get().pk, bid.pk)
+        self.assertEqual(bid.amount, 200)
+        self.assertEqual(self.balance(), 9800)
+
+
+class SoftCloseTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ending_time = timezone.now() + timedelta(minutes=1)
+        self.auction = create_auction(
+            create_customer('seller'),
+            ending_time=self.ending_time,
+            soft_close_window=timedelta(minutes=5),
+            soft_close_extension=timedelta(minutes=5),
+        )
+
+    def bid_at(self, moment, username, amount):
+        with mock.patch('src.auction.bidding.timezone.now', return_value=moment):
+            return place_bid(self.auction.id, create_customer(username).id, Decimal(amount))
+
+    def test_accepts_bids_past_a_stale_ending_time(self):
+        stale = get_auction_window(self.auction.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bid_at(self.ending_time - timedelta(seconds=30), 'first', 150)
+        # Another process still serves the window from before the extension
+        cache.set(auction_window_key(self.auction.id), stale)
+
+        bid = self.bid_at(self.ending_time + timedelta(seconds=30), 'sniper', 200)
+
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_price, bid.amount)
+        # Both bids landed in the closing window, so both extended it
+        self.assertEqual(self.auction.ending_time, self.ending_time + timedelta(minutes=10))
+
+    def test_rejects_bids_past_the_real_ending_time(self):
+        with self.assertRaisesMessage(BidRejected, 'This auction is not accepting bids.'):
+            self.bid_at(self.ending_time + timedelta(seconds=1), 'late', 150)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_price, 100)
+
+
+class AuctionEventTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = create_auction(create_customer('seller'))
+        self.bidder = create_customer('bidder')
+        self.authenticate(self.bidder)
+
+    def bid(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/auctions/{self.auction.id}/bids/', {'amount': amount})
+
+    def test_publish_failure_keeps_the_bid(self):
+        with mock.patch('channels.layers.InMemoryChannelLayer.group_send', side_effect=ConnectionError):
+            with self.assertLogs('django.test', 'ERROR'):
+                response = self.bid(500)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Bid.objects.get(auction=self.auction).amount, 500)
+        self.assertEqual(UserCoin.objects.get(customer=self.bidder).balance, 9500)
+
+    def test_channel_layer_failure_spares_later_callbacks(self):
+        after = mock.Mock()
+        with mock.patch('channels.layers.InMemoryChannelLayer.group_send', side_effect=ConnectionError):
+            with self.assertLogs('django.test', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    publish_auction_event(1, EVENT_BID, current_price='150')
+                    transaction.on_commit(after)
+
+        after.assert_called_once()
+
+
+@override_settings(**TEST_SETTINGS)
+class AuctionStreamTests(AuctionTestMixin, APITransactionTestCase):
+    """
+    Commits for real: the consumers close the database connections of the thread they dispatch on, which
+    would end the transaction of a TestCase.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.auction = create_auction(create_customer('seller'))
+        self.bidder = create_customer('bidder')
+        self.authenticate(self.bidder)
+
+    async def test_bid_reaches_every_subscriber(self):
+        application = URLRouter(websocket_urlpatterns)
+        subscribers = [WebsocketCommunicator(application, f'/ws/auctions/{self.auction.id}/') for _ in range(3)]
+        other_auction = WebsocketCommunicator(application, f'/ws/auctions/{self.auction.id + 1}/')
+        for communicator in (*subscribers, other_auction):
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+        response = await sync_to_async(self.client.post)(f'/api/auctions/{self.auction.id}/bids/', {'amount': 500})
+        self.assertEqual(response.status_code, 201, response.content)
+        bid_id = await Bid.objects.filter(auction=self.auction).values_list('id', flat=True).aget()
+        for communicator in subscribers:
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {
+                    'event': EVENT_BID,
+                    'auction_id': self.auction.id,
+                    'bid_id': bid_id,
+                    'bidder_id': self.bidder.id,
+                    'current_price': '500.00',
+                },
+            )
+        self.assertTrue(await other_auction.receive_nothing())
+
+        for communicator in (*subscribers, other_auction):
+            await communicator.disconnect()
+
+
+@override_settings(AUCTION_CLOSE_AT_ENDING_TIME=True, AUCTION_CLOSE_ETA_HORIZON=2 * 3600)
+class ClosingScheduleTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = create_customer('seller')
+        patcher = mock.patch('src.auction.tasks.close_auction.apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def save(self, auction, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction.save(**kwargs)
+
+    def test_schedules_new_auctions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = create_auction(self.seller)
+        # The tick finds the task already queued
+        schedule_closing_auctions()
+        self.apply_async.assert_called_once_with(args=[auction.id], eta=auction.ending_time)
+
+    def test_ignores_saves_that_keep_the_ending_time(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = create_auction(self.seller)
+        self.apply_async.reset_mock()
+
+        auction.current_price = 150
+        self.save(auction)
+        self.save(auction, update_fields=['current_price'])
+        self.apply_async.assert_not_called()
+
+    def test_reschedules_a_moved_ending_time(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = create_auction(self.seller)
+        self.apply_async.reset_mock()
+
+        auction.ending_time += timedelta(minutes=10)
+        self.save(auction)
+        self.apply_async.assert_called_once_with(args=[auction.id], eta=auction.ending_time)
+
+    def test_waits_for_distant_auctions_to_enter_the_horizon(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = create_auction(self.seller, ending_time=timezone.now() + timedelta(days=2))
+        self.apply_async.assert_not_called()
+
+        auction.ending_time = timezone.now() + timedelta(minutes=30)
+        self.save(auction)
+        self.apply_async.assert_called_once_with(args=[auction.id], eta=auction.ending_time)
+
+    def test_tick_schedules_auctions_entering_the_horizon(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = create_auction(self.seller, ending_time=timezone.now() + timedelta(hours=3))
+        schedule_closing_auctions()
+        self.apply_async.assert_not_called()
+
+        # An hour and a half later the auction is two hours from its end
+        later = timezone.now() + timedelta(minutes=90)
+        with mock.patch('src.auction.tasks.timezone.now', return_value=later):
+            schedule_closing_auctions()
+            schedule_closing_auctions()
+        self.apply_async.assert_called_once_with(args=[auction.id], eta=auction.ending_time)
+
+
+class AuctionCacheTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = create_customer('seller')
+        self.authenticate(self.seller)
+
+    def test_slug_lookup_finds_a_new_auction(self):
+        collection = Collection.objects.create(title='Lenses')
+        product = Product.objects.create(title='Zoom lens', customer=self.seller, collection=collection, price=100)
+        self.assertEqual(self.client.get(f'/api/auctions/{product.slug}/').status_code, 404)
+
+        now = timezone.now()
+        auction = Auction.objects.create(
+            product=product, starting_price=100, current_price=100, starting_time=now, ending_time=now + timedelta(hours=1)
+        )
+        response = self.client.get(f'/api/auctions/{product.slug}/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['id'], auction.id)
+
+    def test_settlement_invalidates_after_the_commit(self):
+        auction = create_auction(self.seller, ending_time=timezone.now())
+        version = get_version(auction_version_key(auction.id))
+        get_auction_window(auction.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            close_overdue_auctions(10)
+            # Nothing is dropped before the commit, when readers would cache the auction again as it was
+            self.assertEqual(get_version(auction_version_key(auction.id)), version)
+            self.assertIsNotNone(cache.get(auction_window_key(auction.id)))
+
+        self.assertGreater(get_version(auction_version_key(auction.id)), version)
+        self.assertIsNone(cache.get(auction_window_key(auction.id)))
+
+
+class SlugTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = create_customer('seller')
+        self.collection = Collection.objects.create(title='Cameras')
+
+    def create_product(self):
+        return Product.objects.create(title='Vintage camera', customer=self.seller, collection=self.collection, price=100)
+
+    def test_draws_another_slug_when_it_is_taken(self):
+        taken = self.create_product()
+        suffixes = iter([taken.slug.rsplit('-', 1)[1], 'a' * slugs.SLUG_SUFFIX_LENGTH])
+        with mock.patch.object(slugs, 'slug_suffix', side_effect=lambda: next(suffixes)):
+            product = self.create_product()
+
+        self.assertEqual(product.slug, 'vintage-camera-' + 'a' * slugs.SLUG_SUFFIX_LENGTH)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_gives_up_after_the_last_attempt(self):
+        suffix = self.create_product().slug.rsplit('-', 1)[1]
+        with mock.patch.object(slugs, 'slug_suffix', return_value=suffix) as slug_suffix:
+            with self.assertRaises(IntegrityError):
+                self.create_product()
+
+        self.assertEqual(slug_suffix.call_count, slugs.SLUG_ATTEMPTS)
+        self.assertEqual(Product.objects.count(), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL.')
+class QueryPlanTests(AuctionTestCase):
+    def test_hot_queries_use_indexes(self):
+        seller = create_customer('seller')
+        auction = create_auction(seller)
+        place_bid(auction.id, create_customer('bidder').id, Decimal(150))
+
+        self.assertEqual(sequential_scans(explain_hot_queries()), [])
+
+
+class ProxyBidTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = create_auction(create_customer('seller'))
+
+    def proxy(self, username, max_amount, auction=None):
+        return ProxyBid.objects.create(auction=auction or self.auction, bidder=create_customer(username), max_amount=max_amount)
+
+    def leader(self, auction=None):
+        auction = Auction.objects.select_related('highest_bid').get(pk=(auction or self.auction).pk)
+        return auction.highest_bid.bidder_id, auction.current_price
+
+    def test_leader_is_the_top_proxy(self):
+        self.proxy('alice', 300)
+        bob = self.proxy('bob', 500)
+        self.proxy('carol', 400)
+
+        resolve_proxies(self.auction.id)
+        self.assertEqual(self.leader(), (bob.bidder_id, 401))
+        # The leader is not outbid by resolving again
+        self.assertIsNone(resolve_proxies(self.auction.id))
+
+    def test_tie_goes_to_the_earliest_proxy(self):
+        alice = self.proxy('alice', 500)
+        bob = self.proxy('bob', 500)
+        ProxyBid.objects.filter(pk=bob.pk).update(created_at=alice.created_at - timedelta(seconds=1))
+
+        resolve_proxies(self.auction.id)
+        self.assertEqual(self.leader(), (bob.bidder_id, 500))
+        self.assertIsNone(resolve_proxies(self.auction.id))
+
+    def test_unfunded_proxy_is_deactivated(self):
+        alice = self.proxy('alice', 300)
+        bob = self.proxy('bob', 5000)
+        adjust_balance(bob.bidder_id, -9800)
+
+        resolve_proxies(self.auction.id)
+        bob.refresh_from_db()
+        self.assertFalse(bob.active)
+        self.assertEqual(self.leader(), (alice.bidder_id, 101))
+        self.assertFalse(Bid.objects.filter(bidder=bob.bidder).exists())
+
+    def test_hundreds_of_competing_proxies(self):
+        small = create_auction(self.auction.product.customer)
+        self.proxy('small0', 1000, small)
+        self.proxy('small1', 1001, small)
+        with CaptureQueriesContext(connection) as queries:
+            resolve_proxies(small.id)
+
+        proxies = ProxyBid.objects.bulk_create(
+            ProxyBid(auction=self.auction, bidder=create_customer(f'bidder{i}'), max_amount=1000 + i) for i in range(300)
+        )
+        with self.assertNumQueries(len(queries)):
+            resolve_proxies(self.auction.id)
+
+        self.assertEqual(self.leader(), (proxies[-1].bidder_id, 1299))
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 1)
+
+
+class SettlementTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = create_customer('seller')
+        self.auction = create_auction(self.seller)
+        self.alice = create_customer('alice')
+        self.bob = create_customer('bob')
+
+    def balances(self):
+        return dict(UserCoin.objects.values_list('customer_id', 'balance'))
+
+    def settle(self):
+        Auction.objects.filter(pk=self.auction.pk).update(ending_time=timezone.now())
+        return close_overdue_auctions(10)
+
+    def test_captures_the_winner_and_refunds_the_other_holds(self):
+        place_bid(self.auction.id, self.alice.id, Decimal(200))
+        place_bid(self.auction.id, self.bob.id, Decimal(250))
+        place_bid(self.auction.id, self.bob.id, Decimal(300))
+        self.assertEqual(self.settle(), 1)
+
+        balances = self.balances()
+        self.assertEqual(balances[self.alice.id], 10000)
+        self.assertEqual(balances[self.bob.id], 9700)
+        self.assertEqual(balances[self.seller.id], 10300)
+        statuses = dict(CoinHold.objects.values_list('customer_id', 'status'))
+        self.assertEqual(statuses, {self.alice.id: CoinHold.HOLD_STATUS_RELEASED, self.bob.id: CoinHold.HOLD_STATUS_CAPTURED})
+        self.assertEqual(dict(ledger_balances()), balances)
+        self.assertFalse(unsettled_escrow().exists())
+
+    def test_refunds_what_the_hold_locked(self):
+        place_bid(self.auction.id, self.alice.id, Decimal(200))
+        place_bid(self.auction.id, self.bob.id, Decimal(300))
+        # A bid removed by hand leaves its coins held until the auction is settled
+        Bid.objects.filter(bidder=self.alice).delete()
+        self.settle()
+
+        self.assertEqual(self.balances()[self.alice.id], 10000)
+        self.assertFalse(unsettled_escrow().exists())
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = create_customer('admin', is_staff=True)
+        self.authenticate(admin)
+        Transaction.objects.bulk_create(
+            Transaction(
+                invoice=f'Invoice, "{i}"',
+                user=admin,
+                amount=i,
+                transaction_type=Transaction.TRANSACTION_TYPE_DEPOSITE,
+                transaction_status=Transaction.TRANSACTION_STATUS_COMPLETED,
+            )
+            for i in range(1, 8)
+        )
+        self.fields = EXPORTS['transactions'][1]
+        self.ids = list(Transaction.objects.order_by('pk').values_list('id', flat=True))
+
+    def export(self, file_format):
+        response = self.client.get(f'/api/exports/transactions/?type={file_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="transactions.{file_format}"')
+        return b''.join(response.streaming_content).decode()
+
+    def test_streams_csv_across_chunks(self):
+        rows = list(csv.reader(StringIO(self.export('csv'))))
+        self.assertEqual(rows[0], self.fields)
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.ids)
+        self.assertIn('Invoice, "7"', rows[-1])
+
+    def test_streams_json_across_chunks(self):
+        rows = json.loads(self.export('json'))
+        self.assertEqual([list(row) for row in rows], [self.fields] * len(self.ids))
+        self.assertEqual([row['id'] for row in rows], self.ids)
+        self.assertEqual(rows[-1]['invoice'], 'Invoice, "7"')
+
+    def test_streams_an_empty_export(self):
+        Transaction.objects.all().delete()
+        self.assertEqual(json.loads(self.export('json')), [])
+        self.assertEqual(list(csv.reader(StringIO(self.export('csv')))), [self.fields])
+
+
+class SearchTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        seller = create_customer('seller')
+        self.authenticate(seller)
+        self.in_title = create_auction(seller, title='Leica M6 rangefinder')
+        self.in_description = create_auction(seller, title='Camera strap')
+        product = self.in_description.product
+        product.description = 'Fits a Leica body'
+        product.save()
+        create_auction(seller, title='Oak desk')
+
+    def search(self, terms):
+        response = self.client.get('/api/auctions/', {'search': terms})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [auction['id'] for auction in response.data['results']]
+
+    @skipUnless(connection.vendor == 'postgresql', 'Search documents are only maintained on PostgreSQL.')
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('leica'), [self.in_title.id, self.in_description.id])
+        # Stemmed, with web search syntax
+        self.assertEqual(self.search('leicas -strap'), [self.in_title.id])
+        self.assertEqual(self.search('"leica body"'), [self.in_description.id])
+
+    @skipUnless(connection.vendor != 'postgresql', 'The substring fallback only serves other databases.')
+    def test_falls_back_to_substring_search(self):
+        # AuctionViewSet.search_fields leave descriptions out
+        self.assertEqual(self.search('leica'), [self.in_title.id])
+        self.assertEqual(self.search('eica m6'), [self.in_title.id])
+
+
+class SuggestTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        seller = create_customer('seller')
+        create_auction(seller, title='Leica M6 rangefinder')
+        create_auction(seller, title='Leica')
+        Collection.objects.create(title='Rangefinders')
+        Tag.objects.create(label='Leather strap')
+
+    def suggest(self, term):
+        return [
+            (suggestion['type'], suggestion['text'])
+            for suggestion in self.client.get('/api/suggest/', {'q': term}).data['results']
+        ]
+
+    @skipUnless(connection.vendor != 'postgresql', 'The prefix trie only serves other databases.')
+    def test_trie_matches_word_starts(self):
+        with mock.patch('src.auction.suggest._trie', None):
+            # Shorter texts first
+            self.assertEqual(self.suggest('LEI'), [('product', 'Leica'), ('product', 'Leica M6 rangefinder')])
+            self.assertEqual(self.suggest('range'), [('collection', 'Rangefinders'), ('product', 'Leica M6 rangefinder')])
+            self.assertEqual(self.suggest('strap'), [('tag', 'Leather strap')])
+            self.assertEqual(self.suggest('eica'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Trigram suggestions are only served on PostgreSQL.')
+    def test_trigram_matches_substrings_and_typos(self):
+        self.assertEqual(self.suggest('eica')[:2], [('product', 'Leica'), ('product', 'Leica M6 rangefinder')])
+        self.assertIn(('collection', 'Rangefinders'), self.suggest('rangefindres'))
+
+
+class ImportProductsTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = create_customer('seller')
+        self.collection = Collection.objects.create(title='Cameras')
+
+    def import_products(self, rows, header=('title', 'description', 'price', 'collection', 'customer'), batch_size=2):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+        self.addCleanup(os.remove, file.name)
+        stdout = StringIO()
+        call_command('import_products', file.name, batch_size=batch_size, stdout=stdout)
+        return stdout.getvalue()
+
+    def row(self, title, price='10.50', **ids):
+        return [title, 'Boxed', price, ids.get('collection', self.collection.id), ids.get('customer', self.seller.id)]
+
+    def test_imports_in_batches(self):
+        output = self.import_products([self.row('Vintage camera') for _ in range(5)])
+
+        self.assertIn('2 products imported\n4 products imported\n5 products imported', output)
+        products = Product.objects.filter(collection=self.collection)
+        self.assertEqual(products.count(), 5)
+        self.assertEqual(len(set(products.values_list('slug', flat=True))), 5)
+        self.assertEqual(set(products.values_list('price', 'customer_id')), {(Decimal('10.50'), self.seller.id)})
+
+    def test_stops_at_the_first_invalid_row(self):
+        rows = [self.row('Lens'), self.row('Tripod'), self.row('Flash'), self.row('Strap', price='cheap'), self.row('Bag')]
+        with self.assertRaisesMessage(CommandError, 'Line 5: invalid price cheap'):
+            self.import_products(rows)
+        # Batches are committed one by one: the batch holding the invalid row is not
+        self.assertEqual(list(Product.objects.order_by('pk').values_list('title', flat=True)), ['Lens', 'Tripod'])
+
+        with self.assertRaisesMessage(CommandError, 'Line 2: unknown collection 0'):
+            self.import_products([self.row('Lens', collection=0)])
+        with self.assertRaisesMessage(CommandError, 'Line 3: unknown customer 0'):
+            self.import_products([self.row('Lens'), self.row('Tripod', customer=0)])
+        with self.assertRaisesMessage(CommandError, 'Missing columns: collection, price'):
+            self.import_products([['Lens', 'Boxed', self.seller.id]], header=('title', 'description', 'customer'))
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class ReconcileLedgerTests(AuctionTestCase):
+    def test_fix_rewrites_drifting_balances(self):
+        drifting, steady = create_customer('drifting'), create_customer('steady')
+        UserCoin.objects.filter(customer=drifting).update(balance=7)
+
+        with self.assertRaisesMessage(CommandError, 'The coin ledger does not reconcile.'):
+            call_command('reconcile_ledger', stdout=StringIO())
+        call_command('reconcile_ledger', '--fix', stdout=StringIO())
+
+        self.assertEqual(dict(UserCoin.objects.values_list('customer_id', 'balance')), {drifting.id: 10000, steady.id: 10000})
+        self.assertEqual(materialize_balances([drifting.id, steady.id]), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent bids are only checked on PostgreSQL: SQLite locks the whole database.')
+class ConcurrentBidTests(ConcurrentAuctionTestCase):
+    def test_one_customer_bids_on_fifty_auctions(self):
+        seller = create_customer('seller')
+        auctions = [create_auction(seller) for _ in range(50)]
+        bidder = create_customer('bidder')
+
+        # 50 bids of 250 against a balance of 10000: exactly 40 can be funded
+        results = self.run_concurrently(place_bid, [(auction.id, bidder.id, Decimal(250)) for auction in auctions])
+
+        self.assertEqual(sum(isinstance(result, Bid) for result in results), 40)
+        self.assertEqual(sum(isinstance(result, InsufficientBalance) for result in results), 10)
+        self.assertEqual(UserCoin.objects.get(customer=bidder).balance, 0)
+        held = CoinHold.objects.filter(customer=bidder, status=CoinHold.HOLD_STATUS_HELD)
+        self.assertEqual(held.count(), 40)
+        self.assertEqual(sum(held.values_list('amount', flat=True)), 10000)
+        self.assertEqual(dict(ledger_balances())[bidder.id], 0)
+
+    def test_many_bidders_on_one_auction(self):
+        auction = create_auction(create_customer('seller'))
+        bidders = [create_customer(f'bidder-{i}') for i in range(50)]
+
+        # Every bidder raises four times, all of them at once; no two bids share an amount
+        calls = [
+            (auction.id, bidder.id, Decimal(200 + raise_ * 100 + i)) for raise_ in range(4) for i, bidder in enumerate(bidders)
+        ]
+        results = self.run_concurrently(place_bid, calls)
+
+        unexpected = [result for result in results if isinstance(result, Exception) and not isinstance(result, BidRejected)]
+        self.assertEqual(unexpected, [])
+        accepted = [result for result in results if isinstance(result, Bid)]
+        self.assertTrue(accepted)
+        self.assertEqual(Bid.objects.filter(auction=auction).count(), len({bid.bidder_id for bid in accepted}))
+
+        # The auction ends on the highest accepted bid, and every bidder's coins are either held or available
+        auction.refresh_from_db()
+        highest = max(accepted, key=lambda bid: bid.amount)
+        self.assertEqual(auction.current_price, highest.amount)
+        self.assertEqual(auction.highest_bid_id, highest.id)
+        self.assertEqual(auction.bids_count, Bid.objects.filter(auction=auction).count())
+        holds = dict(CoinHold.objects.filter(auction=auction).values_list('customer_id', 'amount'))
+        for bidder in bidders:
+            balance = UserCoin.objects.get(customer=bidder).balance
+            self.assertEqual(balance + holds.get(bidder.id, 0), 10000)
+            self.assertEqual(dict(ledger_balances())[bidder.id], balance)
+
+        Auction.objects.filter(pk=auction.pk).update(ending_time=timezone.now())
+        close_overdue_auctions(10)
+
+        winner = Bid.objects.get(pk=highest.id).bidder_id
+        for bidder in bidders:
+            expected = 10000 - highest.amount if bidder.id == winner else 10000
+            self.assertEqual(UserCoin.objects.get(customer=bidder).balance, expected)
+        self.assertFalse(unsettled_escrow().exists())
+
+    def test_settlement_leaves_an_auction_with_a_bid_in_flight(self):
+        auction = create_auction(create_customer('seller'))
+        bidder = create_customer('bidder')
+        place_bid(auction.id, bidder.id, Decimal(200))
+        Auction.objects.filter(pk=auction.pk).update(ending_time=timezone.now())
+        locked, released = threading.Event(), threading.Event()
+
+        def raise_bid():
+            # Holds the bid row the way place_bid does before it reaches the auction row
+            with transaction.atomic():
+                Bid.objects.select_for_update().get(auction=auction, bidder=bidder)
+                locked.set()
+                released.wait(10)
+
+        def settle():
+            locked.wait(10)
+            try:
+                return close_overdue_auctions(10)
+            finally:
+                released.set()
+
+        _, settled = self.run_concurrently(lambda work: work(), [(raise_bid,), (settle,)], workers=2)
+        self.assertEqual(settled, 0)
+        self.assertEqual(close_overdue_auctions(10), 1)
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Concurrent rewrites are only checked on PostgreSQL: SQLite locks the whole database.'
+)
+class ConcurrentLedgerTests(ConcurrentAuctionTestCase):
+    def test_rewrite_waits_for_a_balance_being_moved(self):
+        customer = create_customer('customer')
+        UserCoin.objects.filter(customer=customer).update(balance=7)
+        moving = threading.Event()
+
+        def deposit():
+            with transaction.atomic():
+                adjust_balance(customer.id, 500)
+                moving.set()
+                time.sleep(0.5)
+
+        def rewrite():
+            moving.wait(10)
+            return materialize_balances([customer.id])
+
+        _, rewritten = self.run_concurrently(lambda work: work(), [(deposit,), (rewrite,)], workers=2)
+        # Rewritten from a ledger read before the deposit committed, the balance would lose the deposit
+        self.assertEqual(rewritten, 1)
+        self.assertEqual(UserCoin.objects.get(customer=customer).balance, 10500)
+
+
+class ConcurrentSlugTests(ConcurrentAuctionTestCase):
+    def test_same_titled_products_from_parallel_workers(self):
+        seller = create_customer('seller')
+        collection = Collection.objects.create(title='Cameras')
+
+        def create():
+            return Product.objects.create(title='Vintage camera', customer=seller, collection=collection, price=100).slug
+
+        results = self.run_concurrently(create, [()] * 10000)
+
+        self.assertEqual([result for result in results if isinstance(result, Exception)], [])
+        self.assertEqual(len(set(results)), 10000)
+        self.assertEqual(Product.objects.values('slug').distinct().count(), 10000)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent bids are only checked on PostgreSQL: SQLite locks the whole database.')
+class SnipingTests(ConcurrentAuctionTestCase):
+    def test_bidders_sniping_a_soft_close_auction(self):
+        ending_time = timezone.now() + timedelta(minutes=1)
+        auction = create_auction(
+            create_customer('seller'),
+            ending_time=ending_time,
+            soft_close_window=timedelta(minutes=2),
+            soft_close_extension=timedelta(minutes=2),
+        )
+        bidders = [create_customer(f'sniper-{i}') for i in range(10)]
+        # Every process keeps serving the window from before the first extension
+        stale = get_auction_window(auction.id)
+
+        # Each round, every sniper bids at once just before the ending time as it was when the round started
+        for number in range(8):
+            auction.refresh_from_db()
+            previous_ending_time = auction.ending_time
+            moment = previous_ending_time - timedelta(seconds=10)
+            amounts = [1000 + number * 100 + i for i in range(len(bidders))]
+            with mock.patch('src.auction.bidding.get_auction_window', return_value=stale):
+                with mock.patch('src.auction.bidding.timezone.now', return_value=moment):
+                    results = self.run_concurrently(
+                        place_bid, [(auction.id, bidder.id, Decimal(amount)) for bidder, amount in zip(bidders, amounts)]
+                    )
+
+            rejected = [str(result) for result in results if isinstance(result, BidRejected)]
+            self.assertNotIn('This auction is not accepting bids.', rejected)
+            self.assertTrue(any(isinstance(result, Bid) for result in results), results)
+            auction.refresh_from_db()
+            self.assertEqual(auction.current_price, max(amounts))
+            # Only the first bid of the round lands in the closing window of the ending time it moves
+            self.assertEqual(auction.ending_time, previous_ending_time + timedelta(minutes=2))
+
+        with mock.patch('src.auction.bidding.get_auction_window', return_value=stale):
+            with mock.patch('src.auction.bidding.timezone.now', return_value=auction.ending_time):
+                with self.assertRaisesMessage(BidRejected, 'This auction is not accepting bids.'):
+                    place_bid(auction.id, bidders[0].id, Decimal(5000))
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+from .bidqueue import get_bid_queue, get_partition
+from .orderbook import get_order_book
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket kept in the cache: a client holds up to ``num_requests`` tokens, refilled at
+    ``num_requests / duration`` per second, and each request takes one. Bursts up to the bucket
+    size go through; after that requests are spaced at the refill rate. Unlike the request log of
+    SimpleRateThrottle, the state is two numbers per key whatever the rate. Like it, the read and
+    the write are not atomic, so concurrent requests may slightly overdraw a bucket.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        tokens, updated_at = self.cache.get(self.key, (self.num_requests, self.now))
+        self.tokens = min(self.num_requests, tokens + (self.now - updated_at) * self.num_requests / self.duration)
+        if self.tokens < 1:
+            return False
+        self.cache.set(self.key, (self.tokens - 1, self.now), self.duration)
+        return True
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class BidUserThrottle(TokenBucketThrottle):
+    """Bids placed by one user, across all auctions."""
+
+    scope = 'bids_user'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AuctionBidThrottle(TokenBucketThrottle):
+    """Bids placed on one auction, by all users."""
+
+    scope = 'bids_auction'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': view.kwargs['auction_pk']}
+
+
+def bid_backlog(auction_id):
+    """Bids accepted and not yet written to the database, on the path the bids of this auction take."""
+    if settings.AUCTION_BID_QUEUE_ENABLED:
+        # Partitions are drained independently, so only the auction's own partition matters
+        return get_bid_queue().depth(get_partition(auction_id))
+    if settings.AUCTION_ORDER_BOOK_ENABLED:
+        return get_order_book().pending_count()
+    return 0
+
+
+class BidAdmissionThrottle(BaseThrottle):
+    """
+    Sheds bid writes while the backend is saturated: when the order book, or the bid queue
+    partition of the auction, has more bids waiting for the database than
+    AUCTION_ADMISSION_MAX_BACKLOG. Refused clients get a 429 with a Retry-After of
+    AUCTION_ADMISSION_RETRY_AFTER seconds. Bids placed in the request have no backlog to measure
+    and are never shed here.
+    """
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return bid_backlog(view.kwargs['auction_pk']) <= settings.AUCTION_ADMISSION_MAX_BACKLOG
+
+    def wait(self):
+        return settings.AUCTION_ADMISSION_RETRY_AFTER
+
+
+def first_refusal(throttles, request, view):
+    # Stop at the first refusal: requests shed by admission control or by the bucket of their
+    # user must not use up the shared bucket of the auction
+    return next((throttle for throttle in throttles if not throttle.allow_request(request, view)), None)
+
+
+class BidThrottlingMixin:
+    throttle_classes = [BidAdmissionThrottle, BidUserThrottle, AuctionBidThrottle]
+
+    def check_throttles(self, request):
+        throttle = first_refusal(self.get_throttles(), request, self)
+        if throttle is not None:
+            self.throttled(request, throttle.wait())
+
+
+def check_bid_throttles(request, auction_id):
+    """The throttles of BidThrottlingMixin for bid views outside of DRF. Returns the refusing throttle, if any."""
+    view = SimpleNamespace(kwargs={'auction_pk': auction_id})
+    return first_refusal([throttle() for throttle in BidThrottlingMixin.throttle_classes], request, view)
@@ -1,6 +1,7 @@
 from django.urls import path
 from rest_framework_nested import routers
 
+from . import async_views
 from .views import *
 
 # Your code here
@@ -10,6 +11,9 @@ router.register('collections', CollectionViewSet)
 router.register('customers', CustomerViewSet, basename='customer')
 router.register('wishlists', WishlistViewSet)
 router.register('auctions', AuctionViewSet, basename='auction')
+router.register('exports', ExportViewSet, basename='export')
+router.register('suggest', SuggestViewSet, basename='suggest')
+router.register('bid-tickets', BidTicketViewSet, basename='bid-tickets')
 
 customer_router = routers.NestedDefaultRouter(router, 'customers', lookup='customer')
 customer_router.register('reviews', ReviewViewSet, basename='customer-reviews')
@@ -38,6 +42,8 @@ auction_router.register('chats', AuctionChatViewSet, basename='auction-chats')
 
 auction_router.register('bids', BidsViewSet, basename='auction-bids')
 
+auction_router.register('proxy-bids', ProxyBidViewSet, basename='auction-proxy-bids')
+
 auction_router.register('questions', AuctionQuestionViewSet, basename='auction-questions')
 
 answer_router = routers.NestedDefaultRouter(auction_router, 'questions', lookup='question')
@@ -78,6 +84,9 @@ urlpatterns = (
             AuctionViewSet.as_view({'get': 'retrieve_by_slug'}),
             name='auction-detail-slug',
         ),
+        path('async/auctions/', async_views.auction_list, name='async-auction-list'),
+        path('async/auctions/<int:auction_id>/', async_views.auction_detail, name='async-auction-detail'),
+        path('async/auctions/<int:auction_id>/bids/', async_views.auction_bids, name='async-auction-bids'),
         collection_detail_path('int', 'id', 'id'),
         collection_detail_path('slug', 'slug', 'slug'),
     ]
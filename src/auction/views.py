@@ -1,25 +1,41 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Count
 from django.db.models.deletion import ProtectedError
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ViewSet
+
+from src.core.authentication import StatelessJWTAuthentication
 
-from .filters import AuctionFilter, ProductFilter, TransactionFilter, WishListItemFilter
+from .bidqueue import get_ticket
+from .cache import LISTING_VERSION_KEY, auction_slug_key, auction_version_key, get_or_build, get_version
+from .exports import EXPORT_FORMATS, EXPORTS, export_response
+from .filters import AuctionFilter, FullTextSearchFilter, ProductFilter, TransactionFilter, WishListItemFilter
+from .ingestion import deferred_ingestion_enabled, submit_bid
 from .models import *
-from .pagination import DefaultPagination
+from .pagination import DefaultCursorPagination, DefaultPagination, UpdatedCursorPagination
 from .permissions import *
+from .queryplan import QueryPlanMixin, apply_query_plan
+from .resolvers import get_customer, get_customer_id, lazy_auction_title
 from .serializers import *
+from .suggest import suggest
+from .throttles import BidThrottlingMixin
 
 
 @extend_schema(tags=['Collection'])
 class CollectionViewSet(ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    # pagination_class = DefaultPagination
+    pagination_class = DefaultCursorPagination
     search_fields = ['title']
     ordering_fields = ['created_at', 'products_count']
 
@@ -69,8 +85,8 @@ class CollectionViewSet(ModelViewSet):
 
 @extend_schema(tags=['Customer Balance'])
 class CustomerCoinViewSet(ModelViewSet):
-    # TODO: allow only GET Method
-    # http_method_names = ['get', 'head', 'options']
+    # Balances only move through the coin ledger, see src/auction/ledger.py
+    http_method_names = ['get', 'head', 'options']
     serializer_class = CustomerCoinSerializer
 
     def get_queryset(self):
@@ -78,17 +94,18 @@ class CustomerCoinViewSet(ModelViewSet):
 
 
 @extend_schema(tags=['Product'])
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(QueryPlanMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
-    pagination_class = DefaultPagination
+    pagination_class = UpdatedCursorPagination
     permission_classes = [IsAuthenticated]
     search_fields = ['title', 'description', 'collection__title']
     ordering_fields = ['price', 'updated_at']
 
     def get_queryset(self):
-        return Product.objects.select_related('collection').prefetch_related('images').filter(customer_id=self.request.user.id)
+        return Product.objects.filter(customer_id=self.request.user.id)
 
     def destroy(self, request, *args, **kwargs):
         try:
@@ -157,14 +174,12 @@ class ReviewViewSet(ModelViewSet):
     serializer_class = ReviewSerializer
 
     def get_serializer_context(self):
-        user_id = self.request.user.id
-        reviewer = Customer.objects.get(user_id=user_id)
-
-        return {'seller_id': self.kwargs['customer_pk'], 'reviewer_id': reviewer.id}
+        return {'seller_id': self.kwargs['customer_pk'], 'reviewer_id': get_customer_id(self.request)}
 
 
 @extend_schema(tags=['Customer'])
-class CustomerViewSet(ModelViewSet):
+class CustomerViewSet(QueryPlanMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     serializer_class = CustomerSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     pagination_class = DefaultPagination
@@ -173,7 +188,7 @@ class CustomerViewSet(ModelViewSet):
     filterset_fields = ['membership']
 
     def get_queryset(self):
-        return Customer.objects.select_related('user').filter(user_id=self.request.user.id)
+        return Customer.objects.filter(user_id=self.request.user.id)
 
     # def get_permissions(self):
     #     if self.request.method == 'GET':
@@ -182,7 +197,7 @@ class CustomerViewSet(ModelViewSet):
 
     @action(detail=False, methods=['GET', 'PUT'], permission_classes=[IsAuthenticated])
     def me(self, request):
-        customer = Customer.objects.select_related('user').get(user_id=request.user.id)
+        customer = get_customer(request)
 
         if request.method == 'GET':
             serializer = CustomerSerializer(customer)
@@ -213,9 +228,10 @@ class WishlistViewSet(ModelViewSet):
 
 
 @extend_schema(tags=['Wishlist'])
-class WishlistItemViewSet(ModelViewSet):
+class WishlistItemViewSet(QueryPlanMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    # pagination_class = DefaultPagination
+    pagination_class = DefaultCursorPagination
     # search_fields = ['auction__product__title']
     ordering_fields = ['created_at']
     filterset_class = WishListItemFilter
@@ -227,11 +243,7 @@ class WishlistItemViewSet(ModelViewSet):
         return WishlistItemSerializer
 
     def get_queryset(self):
-        return (
-            WishlistItem.objects.filter(wishlist_id=self.kwargs['wishlist_pk'])
-            .select_related('auction')
-            .prefetch_related('auction__product__images')
-        )
+        return WishlistItem.objects.filter(wishlist_id=self.kwargs['wishlist_pk'])
 
     def get_serializer_context(self):
         return {'wishlist_id': self.kwargs['wishlist_pk']}
@@ -249,12 +261,15 @@ class ProductImageViewSet(ModelViewSet):
 
 
 @extend_schema(tags=['Auction'])
-class AuctionViewSet(ModelViewSet):
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+class AuctionViewSet(QueryPlanMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     serializer_class = AuctionSerializer
+    pagination_class = DefaultCursorPagination
 
     search_fields = ['product__title', 'product__collection__title']
-    ordering_fields = ['starting_time', 'current_price', 'bids_count']
+    search_vector_field = 'product__search_vector'
+    ordering_fields = ['created_at', 'starting_time', 'ending_time', 'current_price', 'bids_count']
     filterset_class = AuctionFilter
 
     def get_serializer_class(self):
@@ -263,17 +278,42 @@ class AuctionViewSet(ModelViewSet):
         return self.serializer_class
 
     def get_queryset(self):
-        queryset = Auction.objects.select_related('product', 'product__customer', 'product__customer__user').prefetch_related(
-            'product__images'
-        )
-        queryset = queryset.annotate(bids_count=Count('bids'))
-        return queryset
+        return Auction.objects.all()
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({'customer_id': self.request.user.id})
         return context
 
+    def list(self, request, *args, **kwargs):
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f'auction-cache:listing:v{get_version(LISTING_VERSION_KEY)}:{path}'
+        data = get_or_build(
+            key, lambda: super(AuctionViewSet, self).list(request, *args, **kwargs).data, settings.AUCTION_LISTING_CACHE_TIMEOUT
+        )
+        return Response(data)
+
+    def get_cached_auction(self, auction_id):
+        key = f'auction-cache:{auction_id}:v{get_version(auction_version_key(auction_id))}:detail'
+        return get_or_build(
+            key,
+            lambda: self.serializer_class(apply_query_plan(self.get_queryset(), self.serializer_class).get(id=auction_id)).data,
+            settings.AUCTION_DETAIL_CACHE_TIMEOUT,
+        )
+
+    def get_auction_id_by_slug(self, slug):
+        # Product slugs never change, so the slug of an auction is resolved once and only forgotten
+        # when an auction of the product is saved or deleted. Misses are not cached: the auction of
+        # a product may be created at any time.
+        key = auction_slug_key(slug)
+        auction_id = cache.get(key)
+        if auction_id is None:
+            auction_id = Auction.objects.filter(product__slug=slug).values_list('id', flat=True).first()
+            if auction_id is None:
+                raise Auction.DoesNotExist
+            cache.set(key, auction_id)
+        return auction_id
+
     @action(
         detail=True,
         methods=['get', 'put', 'delete'],
@@ -281,7 +321,10 @@ class AuctionViewSet(ModelViewSet):
     )
     def retrieve_by_slug(self, request, slug=None):
         try:
-            auction = Auction.objects.annotate(bids_count=Count('bids')).get(product__slug=slug)
+            if request.method == 'GET':
+                return Response(self.get_cached_auction(self.get_auction_id_by_slug(slug)))
+
+            auction = Auction.objects.get(product__slug=slug)
             if request.method == 'DELETE':
                 # Check if bids to this auction exist or not if exist can not delete
                 if auction.bids_count > 0:
@@ -301,10 +344,6 @@ class AuctionViewSet(ModelViewSet):
                 # Handle update logic here
 
                 return Response(status=status.HTTP_501_NOT_IMPLEMENTED)  # Placeholder for PUT logic
-
-            else:  # GET
-                serializer = self.serializer_class(auction)
-                return Response(serializer.data)
         except Auction.DoesNotExist:
             return Response({'detail': 'Auction not found.'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -315,7 +354,10 @@ class AuctionViewSet(ModelViewSet):
     )
     def retrieve_by_auction_id(self, request, auction_id=None):
         try:
-            auction = Auction.objects.annotate(bids_count=Count('bids')).get(id=auction_id)
+            if request.method == 'GET':
+                return Response(self.get_cached_auction(auction_id))
+
+            auction = Auction.objects.get(id=auction_id)
             if request.method == 'DELETE':
                 # Check if bids to this auction exist or not if exist can not delete
                 if auction.bids_count > 0:
@@ -335,10 +377,6 @@ class AuctionViewSet(ModelViewSet):
                 auction_serializer.is_valid(raise_exception=True)
                 auction_serializer.save()
                 return Response(auction_serializer.data)
-
-            else:  # GET
-                serializer = self.serializer_class(auction)
-                return Response(serializer.data)
         except Auction.DoesNotExist:
             return Response({'detail': 'Auction not found.'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -351,19 +389,30 @@ class AuctionChatViewSet(ModelViewSet):
         return Chat.objects.filter(auction_id=self.kwargs['auction_pk'])
 
     def get_serializer_context(self):
-        user_id = self.request.user.id
-        customer = Customer.objects.get(user_id=user_id)
-        return {'auction_id': self.kwargs['auction_pk'], 'customer_id': customer.id}
+        return {'auction_id': self.kwargs['auction_pk'], 'customer_id': get_customer_id(self.request)}
 
 
 @extend_schema(tags=['Bids'])
-class BidsViewSet(ModelViewSet):
+class BidsViewSet(BidThrottlingMixin, QueryPlanMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     serializer_class = BidsSerializer
     filter_backends = [SearchFilter]
+    pagination_class = UpdatedCursorPagination
     search_fields = ['bidder__user__id']
 
+    def create(self, request, *args, **kwargs):
+        if not deferred_ingestion_enabled():
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data, status_code, headers = submit_bid(
+            request, int(self.kwargs['auction_pk']), serializer.context['bidder_id'], serializer.validated_data['amount']
+        )
+        return Response(data, status=status_code, headers=headers)
+
     def get_queryset(self):
-        return Bid.objects.select_related('bidder__user').filter(auction_id=self.kwargs['auction_pk']).order_by('-updated_at')
+        return Bid.objects.filter(auction_id=self.kwargs['auction_pk']).order_by('-updated_at')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -371,15 +420,46 @@ class BidsViewSet(ModelViewSet):
 
         if auction_id:
             context['auction_id'] = auction_id
-            context['auction_title'] = Auction.objects.get(id=auction_id).product.title
+            context['auction_title'] = lazy_auction_title(auction_id)
 
         if self.request.user.is_authenticated:
-            customer = Customer.objects.get(user_id=self.request.user.id)
-            context['bidder_id'] = customer.id
+            context['bidder_id'] = get_customer_id(self.request)
 
         return context
 
 
+@extend_schema(tags=['Bids'])
+class BidTicketViewSet(ViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def retrieve(self, request, pk=None):
+        state = get_ticket(pk)
+        # Tickets are only visible to the bidder who placed them
+        if state is None or state['bidder_id'] != get_customer_id(request):
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'ticket': pk, **{key: value for key, value in state.items() if key != 'bidder_id'}})
+
+
+@extend_schema(tags=['Proxy Bids'])
+class ProxyBidViewSet(BidThrottlingMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProxyBidSerializer
+
+    def get_queryset(self):
+        # Maximums are sealed: bidders only ever see their own proxy
+        return ProxyBid.objects.filter(auction_id=self.kwargs['auction_pk'], bidder__user_id=self.request.user.id)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        auction_id = self.kwargs['auction_pk']
+        context['auction_id'] = auction_id
+        context['auction_title'] = lazy_auction_title(auction_id)
+        context['bidder_id'] = get_customer_id(self.request)
+        return context
+
+
 @extend_schema(tags=['Delivery'])
 class DeliveryViewSet(ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
@@ -390,13 +470,14 @@ class DeliveryViewSet(ModelViewSet):
 
 
 @extend_schema(tags=['Auction Question'])
-class AuctionQuestionViewSet(ModelViewSet):
+class AuctionQuestionViewSet(QueryPlanMixin, ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     serializer_class = AuctionQuestionSerializer
-    pagination_class = DefaultPagination
+    pagination_class = DefaultCursorPagination
 
     def get_queryset(self):
         auction_id = self.kwargs['auction_pk']
-        return Question.objects.filter(auction_id=auction_id).prefetch_related('answers').select_related('customer__user')
+        return Question.objects.filter(auction_id=auction_id)
 
     def get_serializer_context(self):
         auction_id = self.kwargs['auction_pk']
@@ -430,13 +511,60 @@ class AddressViewSet(ModelViewSet):
 
 @extend_schema(tags=['Transaction'])
 class TransactionViewSet(ModelViewSet):
+    authentication_classes = [StatelessJWTAuthentication]
     serializer_class = TransactionSerializer
     http_method_names = ['get', 'head', 'options']
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['reference_id', 'invoice']
     ordering_fields = ['created_at']
     filterset_class = TransactionFilter
+    pagination_class = DefaultCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         return Transaction.objects.filter(user_id=self.request.user.id)
+
+    @action(detail=False, methods=['GET'])
+    def export(self, request, *args, **kwargs):
+        file_format = request.query_params.get('type', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'type': [f'Choose one of {", ".join(EXPORT_FORMATS)}.']}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(self.filter_queryset(self.get_queryset()), EXPORTS['transactions'][1], file_format, 'transactions')
+
+
+@extend_schema(tags=['Export'])
+class ExportViewSet(ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response({'exports': list(EXPORTS), 'types': EXPORT_FORMATS})
+
+    def retrieve(self, request, pk=None):
+        if pk not in EXPORTS:
+            return Response({'detail': 'Export not found.'}, status=status.HTTP_404_NOT_FOUND)
+        file_format = request.query_params.get('type', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'type': [f'Choose one of {", ".join(EXPORT_FORMATS)}.']}, status=status.HTTP_400_BAD_REQUEST)
+        model, fields = EXPORTS[pk]
+        return export_response(model.objects.all(), fields, file_format, pk)
+
+
+@extend_schema(tags=['Suggest'])
+class SuggestViewSet(ViewSet):
+    # Called on every keystroke: public, so no token is decoded and no user is loaded
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        term = request.query_params.get('q', '').strip()
+        if len(term) < settings.AUCTION_SUGGEST_MIN_LENGTH:
+            return Response({'q': term, 'results': []})
+        try:
+            limit = int(request.query_params.get('limit', settings.AUCTION_SUGGEST_LIMIT))
+        except ValueError:
+            limit = settings.AUCTION_SUGGEST_LIMIT
+        limit = max(1, min(limit, settings.AUCTION_SUGGEST_MAX_LIMIT))
+
+        response = Response({'q': term, 'results': suggest(term, limit)})
+        patch_cache_control(response, public=True, max_age=settings.AUCTION_SUGGEST_CACHE_TIMEOUT)
+        return response
@@ -2,6 +2,7 @@
 ASGI config for bidzone project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django, WebSocket connections to the Channels consumers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -9,8 +10,20 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bidzone.settings')
 
-application = get_asgi_application()
+# Initialize Django before importing consumers that use the ORM
+django_asgi_application = get_asgi_application()
+
+from src.auction.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter(
+    {
+        'http': django_asgi_application,
+        'websocket': AllowedHostsOriginValidator(URLRouter(websocket_urlpatterns)),
+    }
+)
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third Party Apps
     'corsheaders',
     'django_filters',
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
     'djoser',
     'drf_spectacular',
     'import_export',
+    'channels',
     # Custom Apps
     'src.core',
     'src.auction',
@@ -68,6 +70,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'src.bidzone.wsgi.application'
+ASGI_APPLICATION = 'src.bidzone.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
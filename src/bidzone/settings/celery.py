@@ -1,6 +1,8 @@
 from celery.schedules import crontab
 
 CELERY_BROKER_URL = 'redis://localhost:6379/1'
+# Seconds before Redis redelivers an unacknowledged task, ETA tasks included, see AUCTION_CLOSE_ETA_HORIZON
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3600}
 CELERY_BEAT_SCHEDULE = {
     # 'notify_customers': {
     #     'task': 'playground.tasks.notify_customers',
@@ -11,4 +13,20 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'auction.tasks.process_completed_auctions',
         'schedule': crontab(minute='*/1'),  # Run every minute
     },
+    'schedule-closing-auctions': {
+        'task': 'auction.tasks.schedule_closing_auctions',
+        'schedule': 60,  # Queue exact-time closing for auctions entering AUCTION_CLOSE_ETA_HORIZON
+    },
+    'activate-scheduled-auctions': {
+        'task': 'auction.tasks.activate_scheduled_auctions',
+        'schedule': 1,  # Timer-wheel tick, in seconds
+    },
+    'flush-order-book': {
+        'task': 'auction.tasks.flush_order_book',
+        'schedule': 2,  # Write accepted bids behind every 2 seconds
+    },
+    'drain-bid-queues': {
+        'task': 'auction.tasks.drain_bid_queues',
+        'schedule': 5,  # Wake up partitions whose drain was missed
+    },
 }
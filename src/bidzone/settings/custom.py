@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+    }
+}
+
+# Pub/sub layer fanning auction events out to WebSocket subscribers, see src/auction/events.py
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+        'CONFIG': {'hosts': ['redis://localhost:6379/4']},
+    }
+}
+
+# Live auction order book, see src/auction/orderbook.py
+AUCTION_REDIS_URL = 'redis://localhost:6379/2'
+AUCTION_ORDER_BOOK_ENABLED = False
+AUCTION_ORDER_BOOK_BACKEND = 'src.auction.orderbook.RedisOrderBook'
+AUCTION_ORDER_BOOK_FLUSH_BATCH_SIZE = 500
+# Pending bids a flusher claimed but did not acknowledge within this many seconds are claimed again
+AUCTION_ORDER_BOOK_CLAIM_IDLE = 60
+
+# Queued bid ingestion, see src/auction/bidqueue.py. Run one single-process worker per partition queue:
+# celery -A bidzone worker -Q bids-<partition> --concurrency 1
+AUCTION_BID_QUEUE_ENABLED = False
+AUCTION_BID_QUEUE_BACKEND = 'src.auction.bidqueue.RedisBidQueue'
+AUCTION_BID_QUEUE_PARTITIONS = 8
+AUCTION_BID_QUEUE_BATCH_SIZE = 200
+AUCTION_BID_QUEUE_SCHEDULE_TIMEOUT = 30
+AUCTION_BID_TICKET_TIMEOUT = 3600
+
+# Number of ending auctions settled per transaction, see src/auction/settlement.py
+AUCTION_SETTLEMENT_BATCH_SIZE = 100
+
+# Celery tasks settling overdue auctions in parallel, each claiming its own batches
+AUCTION_CLOSING_WORKERS = 4
+
+# Schedule a close_auction task at the ending time of auctions about to end instead of waiting for the minute tick
+AUCTION_CLOSE_AT_ENDING_TIME = True
+
+# Seconds ahead of its ending time an auction may get its close_auction ETA task. Keep it below the
+# broker's visibility_timeout (CELERY_BROKER_TRANSPORT_OPTIONS), past which Redis delivers waiting
+# ETA tasks again; auctions ending later get theirs from the schedule_closing_auctions tick
+AUCTION_CLOSE_ETA_HORIZON = 50 * 60
+
+# Scheduled auctions switched to active per UPDATE, see activate_scheduled_auctions
+AUCTION_ACTIVATION_BATCH_SIZE = 500
+
+# Seconds the status and time window of an auction stay cached on the bid path
+AUCTION_WINDOW_CACHE_TIMEOUT = 60
+
+# Largest page a client may request with ?page_size= on cursor paginated feeds
+PAGINATION_MAX_PAGE_SIZE = 100
+
+# Read-through cache of auction payloads, see src/auction/cache.py (in seconds)
+AUCTION_DETAIL_CACHE_TIMEOUT = 60
+AUCTION_LISTING_CACHE_TIMEOUT = 5
+AUCTION_CACHE_GRACE_PERIOD = 30
+AUCTION_CACHE_LOCK_TIMEOUT = 2
+
+# Step a proxy bid outbids the runner-up by, see src/auction/proxy.py
+AUCTION_BID_INCREMENT = Decimal('1.00')
+
+# Bid writes are refused with a 429 past this backlog, see BidAdmissionThrottle in src/auction/throttles.py
+AUCTION_ADMISSION_MAX_BACKLOG = 5000
+AUCTION_ADMISSION_RETRY_AFTER = 1
+
+# Rows fetched per round trip by the streaming CSV/JSON exports, see src/auction/exports.py
+EXPORT_CHUNK_SIZE = 2000
+
+# Text search configuration of the product search documents, see src/auction/search.py
+SEARCH_CONFIG = 'english'
+
+# Typeahead of /api/suggest/, see src/auction/suggest.py (timeouts in seconds)
+AUCTION_SUGGEST_MIN_LENGTH = 2
+AUCTION_SUGGEST_LIMIT = 8
+AUCTION_SUGGEST_MAX_LIMIT = 20
+AUCTION_SUGGEST_CACHE_TIMEOUT = 300
+AUCTION_SUGGEST_TRIE_REFRESH = 300
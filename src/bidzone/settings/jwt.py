@@ -3,4 +3,10 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
+    # Adds the customer_id claim read by src.auction.resolvers
+    'TOKEN_OBTAIN_SERIALIZER': 'src.core.serializers.TokenObtainPairSerializer',
+    # Refuses refresh tokens revoked by src.core.authentication.revoke_user
+    'TOKEN_REFRESH_SERIALIZER': 'src.core.serializers.TokenRefreshSerializer',
+    # Built from the claims of the token by src.core.authentication.StatelessJWTAuthentication
+    'TOKEN_USER_CLASS': 'src.core.authentication.TokenUser',
 }
@@ -2,6 +2,11 @@ REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
     'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Token buckets of src.auction.throttles: bucket size per period, refilled over the period
+    'DEFAULT_THROTTLE_RATES': {
+        'bids_user': '30/min',
+        'bids_auction': '50/s',
+    },
     # For global pagination
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'PAGE_SIZE': 2
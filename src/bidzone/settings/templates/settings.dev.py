@@ -3,3 +3,9 @@ SECRET_KEY = 'django-insecure-u&!&5iaw_%pe$um7)#=ewqw@p*2)pu+l!10di!@05yvuul+b88
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
+
+# Use an in-process cache instead of Redis
+# CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Use an in-process channel layer instead of Redis
+# CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
@@ -1,5 +1,10 @@
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+
+from .authentication import is_revoked
 
 
 class UserCreateSerializer(BaseUserCreateSerializer):
@@ -11,3 +16,23 @@ class UserCreateSerializer(BaseUserCreateSerializer):
 class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Access tokens copy the claims of their refresh token, so refreshed tokens keep the customer too
+        token = super().get_token(user)
+        customer = getattr(user, 'customer', None)
+        token['customer_id'] = customer.id if customer is not None else None
+        # Read by src.core.authentication.StatelessJWTAuthentication in place of the user row
+        token['is_staff'] = user.is_staff
+        return token
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    def validate(self, attrs):
+        # Access tokens copy the claims of their refresh token, so a revoked one must not mint new ones
+        if is_revoked(self.token_class(attrs['refresh'])):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        return super().validate(attrs)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import revoke_user
+
+# Claims StatelessJWTAuthentication relies on: tokens are only accepted from active users and
+# carry is_staff, so a change of either makes the tokens issued before it stale
+TOKEN_FIELDS = ('is_active', 'is_staff')
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def revoke_stale_tokens(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(TOKEN_FIELDS)):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS).first()
+    if previous is not None and any(previous[field] != getattr(instance, field) for field in TOKEN_FIELDS):
+        transaction.on_commit(lambda: revoke_user(instance.pk))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_deleted_user(sender, instance, **kwargs):
+    revoke_user(instance.id)
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .serializers import TokenObtainPairSerializer
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.issued_before = timezone.now() - timedelta(seconds=10)
+
+    def refresh_token(self, issued_at):
+        refresh = TokenObtainPairSerializer.get_token(self.user)
+        refresh.set_iat(at_time=issued_at)
+        return refresh
+
+    def access_token(self, issued_at):
+        access = self.refresh_token(issued_at).access_token
+        access.set_iat(at_time=issued_at)
+        return str(access)
+
+    def me(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+        return self.client.get('/api/customers/me/')
+
+    def save_user(self, **fields):
+        for name, value in fields.items():
+            setattr(self.user, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    def test_staff_change_revokes_issued_tokens(self):
+        token = self.access_token(self.issued_before)
+        self.assertEqual(self.me(token).status_code, 200)
+        self.save_user(is_staff=True)
+
+        response = self.me(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'token_revoked')
+        # Tokens issued afterwards carry the new claim and are accepted
+        self.assertEqual(self.me(self.access_token(timezone.now())).status_code, 200)
+
+    def test_deactivation_revokes_issued_tokens(self):
+        token = self.access_token(self.issued_before)
+        self.save_user(is_active=False)
+        self.assertEqual(self.me(token).status_code, 401)
+
+    def test_other_changes_keep_tokens(self):
+        token = self.access_token(self.issued_before)
+        self.save_user(first_name='Alice')
+        self.assertEqual(self.me(token).status_code, 200)
+
+    def test_revoked_refresh_token_cannot_mint_access_tokens(self):
+        refresh = self.refresh_token(self.issued_before)
+        self.save_user(is_staff=True)
+
+        response = self.client.post('/auth/jwt/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post('/auth/jwt/refresh/', {'refresh': str(self.refresh_token(timezone.now()))})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+LABEL_TRIGRAM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['label'], name='tag_label_trgm_idx', opclasses=['gin_trgm_ops']
+)
+
+
+def add_trigram_index(apps, schema_editor):
+    # pg_trgm only exists on PostgreSQL; other databases serve suggestions from a prefix trie
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('tags', 'Tag'), LABEL_TRIGRAM_INDEX)
+
+
+def remove_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('tags', 'Tag'), LABEL_TRIGRAM_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='tag', index=LABEL_TRIGRAM_INDEX)],
+            database_operations=[migrations.RunPython(add_trigram_index, remove_trigram_index)],
+        ),
+    ]
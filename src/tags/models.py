@@ -1,5 +1,6 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -16,6 +17,9 @@ class Tag(models.Model):
     def __str__(self) -> str:
         return self.label
 
+    class Meta:
+        indexes = [GinIndex(fields=['label'], opclasses=['gin_trgm_ops'], name='tag_label_trgm_idx')]
+
 
 class TaggedItem(models.Model):
     objects = TaggedItemManager()
@@ -1,17 +1,51 @@
-from django.utils import timezone
+import secrets
+import string
+
+from django.db import IntegrityError, transaction
 from django.utils.text import slugify
 
+SLUG_ALPHABET = string.digits + string.ascii_lowercase
+SLUG_SUFFIX_LENGTH = 10  # 36 ** 10 suffixes per title
+SLUG_ATTEMPTS = 3
+
+
+def slug_suffix():
+    return ''.join(secrets.choice(SLUG_ALPHABET) for _ in range(SLUG_SUFFIX_LENGTH))
+
 
 def generate_unique_slug(instance, text=''):
-    model = instance.__class__
-    slugify_text = slugify(text)
+    """
+    Slugify ``text`` and append a random suffix, without querying the table.
+
+    With 36 ** 10 suffixes per title a collision is astronomically unlikely, so the unique
+    constraint of the slug column is the only check needed: see save_with_unique_slug.
+    """
+    max_length = instance._meta.get_field('slug').max_length
+    size = max_length - SLUG_SUFFIX_LENGTH - 1
+    return '-'.join(filter(None, [slugify(text)[:size].strip('-'), slug_suffix()]))
+
 
-    current_datetime = timezone.now().strftime('%Y%m%d%H%M%S')
-    new_slug = f'{slugify_text}-{current_datetime}'
+def save_with_unique_slug(instance, text, save, *args, **kwargs):
+    """Save ``instance`` under a new slug, drawing another one on the off chance it is taken."""
+    for attempt in range(SLUG_ATTEMPTS):
+        instance.slug = generate_unique_slug(instance, text)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            if attempt == SLUG_ATTEMPTS - 1 or not type(instance).objects.filter(slug=instance.slug).exists():
+                raise
 
-    # Ensure the generated slug is unique
-    while model.objects.filter(slug=new_slug).exclude(pk=instance.pk).exists():
-        current_datetime = timezone.now().strftime('%Y%m%d%H%M%S')
-        new_slug = f'{slugify_text}-{current_datetime}'
 
-    return new_slug
+def generate_unique_slugs(model, texts):
+    """Slugs for a batch of new rows, checked against the table with a single query."""
+    slugs = [generate_unique_slug(model, text) for text in texts]
+    taken = set(model.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+    while taken or len(set(slugs)) < len(slugs):
+        seen = set()
+        for index, slug in enumerate(slugs):
+            if slug in taken or slug in seen:
+                slugs[index] = generate_unique_slug(model, texts[index])
+            seen.add(slugs[index])
+        taken = set(model.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+    return slugs